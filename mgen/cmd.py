@@ -12,7 +12,7 @@ import datetime
 import optparse
 import shutil
 
-import mgen
+import mgen.generators
 
 __debug = False
 
@@ -26,6 +26,11 @@ if __name__ == '__main__':
     parser.add_option("-r", "--webroot", help = "Root path of deployed website. Used for links & resources. Default is '/'", default = "/")
     parser.add_option("--posts", type="int", help = "Number of posts per page. Default is 10.", default = 10)
     parser.add_option("--items", type="int", help = "Number of items per rss feed. Default is 50.", default = 30)
+    parser.add_option("-j", "--jobs", type="int", help = "Number of processes rendering posts & pages. Default is 1.", default = 1)
+    parser.add_option("--hardlinks", action="store_true", default=False, help = "Hardlink identical output files instead of copying them.")
+    parser.add_option("--gzip", action="store_true", default=False, help = "Write .gz copy of every text file for static gzip serving.")
+    parser.add_option("--gzip-min-size", type="int", help = "Smallest size of a file with .gz copy in bytes. Default is 512.", default = 512)
+    parser.add_option("--fingerprint", action="store_true", default=False, help = "Link resources by names with hash of their content, for long-lived caching.")
     parser.add_option("--title", help = "Title of your website. Default is capitalized source folder name.")
     parser.add_option("--years", help = "Values list separated by comma for inital years filter. Default is current year only")
     parser.add_option("--lang", help = "Language of your site. Default is 'en'", default = 'en')
@@ -34,6 +39,14 @@ if __name__ == '__main__':
     parser.add_option("--ignore-tag", help = "Posts with given comma separate tags will not be included in common pages.")
     
     parser.add_option("--clear", action="store_true", default=False, help="Remove target if any.")
+    parser.add_option("--full", action="store_true", default=False, help="Ignore build manifest and regenerate everything.")
+    parser.add_option("--cache", help = "Path to build cache with manifest of previous build. Default is '.mgen-cache' in source.")
+    parser.add_option("--watch", action="store_true", default=False, help="Keep running and rebuild changed pages on every change of sources.")
+    parser.add_option("--watch-interval", type="float", help = "Seconds between checks for changes in watch mode. Default is 0.5.", default = 0.5)
+    parser.add_option("--profile", help = "Write timings of build phases, templates and output files to a JSON report.", default = None)
+    parser.add_option("--profile-stats", action="store_true", default=False, help="Also dump cProfile stats of the slowest phase next to the report.")
+    parser.add_option("--low-memory", action="store_true", default=False, help="Keep posts and tables of outputs in files on disk instead of memory, for very large sites.")
+    parser.add_option("--tar", help = "Write site to a tar archive at given path instead of target folder. Archive is compressed with gzip unless path ends with .tar or .bz2, '-' is stdout.")
     
     parser.add_option("--skip-posts", action="store_true", default=False, help="Do not generate posts.")
     parser.add_option("--skip-pages", action="store_true", default=False, help="Do not generate pages.")
@@ -55,7 +68,6 @@ if __name__ == '__main__':
 
     options_file = os.path.join(options.source, 'options.yaml')
     if os.path.exists(options_file):
-        print 'Reading options from %s' % options_file
         #parse options from file
         fopts = open(options_file, 'r')
         opts =yaml.load(fopts)
@@ -63,6 +75,13 @@ if __name__ == '__main__':
             setattr(options, key, opts[key])
         fopts.close()
 
+    if options.tar == '-':
+        #archive is streamed to stdout, status output goes to stderr
+        sys.stdout = sys.stderr
+
+    if os.path.exists(options_file):
+        print 'Reading options from %s' % options_file
+
     if not options.target:
         print 'No target specified'
         sys.exit(1)
@@ -71,6 +90,14 @@ if __name__ == '__main__':
         print 'No url specified'
         sys.exit(1)
 
+    if options.tar and options.gzip:
+        print 'Gzip copies cannot be written to a tar archive'
+        sys.exit(1)
+
+    if options.tar == '-' and options.watch:
+        print 'Archive streamed to stdout cannot be rebuilt on changes'
+        sys.exit(1)
+
     #logging configuration
     if options.debug:
         print 'DEBUG mode is ON'
@@ -96,7 +123,9 @@ if __name__ == '__main__':
                 source = source[:1]
             options.title = os.path.basename(source).capitalize()
         
-        gen = mgen.MGEN(options)
+        gen = mgen.generators.MGEN(options)
         gen.generate()
+        if options.watch:
+            gen.watch()
     else:
         parser.print_help()
@@ -11,20 +11,33 @@ import urllib
 import logging
 import datetime
 import yaml
+import json
 import shutil
+import time
+import tempfile
+import functools
+import itertools
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
-from mako.template import Template
-from mako.lookup import TemplateLookup
 from mako import exceptions
 
 import helpers
 import defines
-
-
-rsync_avail = False
-rc = os.system("/usr/bin/rsync --version")
-if rc == 0:
-    rsync_avail = True
+import manifest
+import render
+import pipeline
+import sync
+import postcache
+import dateindex
+import xmlstream
+import watch
+import profiler
+import extsort
+import tagindex
+import backends
+import disktable
 
 
 def yesno(b):
@@ -33,108 +46,117 @@ def yesno(b):
     else: 
         return 'no'
 
-class Post(dict):
-
-    def __init__(self):
-        self["template"] = defines.postTemplate
-
-    #sorting with date member for list.sort()
-    def __cmp__(self, other):
-        if self['date'] == other['date']: return 0
-        if self['date'] < other['date']: return -1
-        else: return 1
-
-
-# RSS Feed template 
-# Arguments:
-#  string title - options.title
-#  string url - options.url
-#  string desc - a description
-#  string lang - a lang value {en, de, es, etc}
-#  list posts
-# Arguments for item rendering:
-#  helpers & os modules
-#  string feedRoot - root of this feed
-#  dict postSizes - dictioanry with size of each post html, key is post['id']
-
-rssTemplate = '''# -*- encoding:utf-8 -*-
-<?xml version="1.0" encoding="utf-8"?>
-<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">
-   <channel>
-      <title>${title}</title>
-      <link>${options.url}</link>
-      <description>${desc}</description>
-      <language>${options.lang}</language>
-        %for post in posts:
-            <% postSize = postSizes[post['id']] %>
-            <item>
-                <title>${post['title']}</title>
-                <pubDate>${post['date'].strftime('%a, %d %B %Y')}</pubDate>
-                <description>${helpers.cgi.escape(helpers.markdown.markdown(''.join(post['text'])))}</description>
-                <link>${options.url + feedRoot + '/' + post['id']}</link>
-            </item>
-        %endfor
-   </channel>
-</rss>
-'''
-
-# Sitemap template
-#
-# Arguments:
-#  list posts - All posts
-#  list pages - All pages
-#  dict tags - All tags
-#  list years - options.years
-#  string url - options.url
-#  string options.webroot - options.webroot
-siteMapTemplate = '''# -*- encoding:utf-8 -*-
-<?xml version='1.0' encoding='UTF-8'?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
-    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-    xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9
-                http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">
-    %for post in posts:
-        <url>
-            <loc>${ options.url + helpers.urljoin(options.webroot, 'post/id/', post['id']) }</loc>
-        </url>
-    %endfor
-    
-    %for y in dates:
-        %for m in dates[y]:
-            %if dates[y][m]:
-                %for d in dates[y][m]:
-                    %if d:
-                        %for post in dates[y][m][d]:            
-                            <url>
-                                <loc>${ options.url + helpers.urljoin(options.webroot, 'post/date/%d/%d/%d/index.html' % (y, m, d)) }</loc>
-                            </url>
-                        %endfor
-                    %endif
-                %endfor
-            %endif
-        %endfor
-    %endfor
-
-    %for pageIndex in range(1, len(pages)):
-        <url>
-            <loc>${ options.url + helpers.urljoin(options.webroot, 'page', str(pageIndex)) }</loc>
-        </url>
-    %endfor
-    
-    %for tag in tags.keys():
-        <url>
-            <loc>${ options.url + helpers.urljoin(options.webroot, 'tag', tag) }</loc>
-        </url>
-    %endfor
-    
-    %for page in miscPages:
-        <url>
-            <loc>${ options.url + helpers.urljoin(options.webroot, page) }</loc>
-        </url>
-    %endfor
-    
-</urlset>
-'''
+class Post(object):
+    '''Parsed post. Known attributes are kept in slots, others in extra dict.
+    Body is not kept, post['text'] reads it from the post file when a template needs it.
+    Templates use dict style access, i.e. post['title']'''
+
+    __slots__ = ('title', 'date', 'tags', 'id', 'template', 'hash', 'path', 'textOffset', 'sortKey', 'extra')
+    fields = ('title', 'date', 'tags', 'id', 'template', 'hash')
+
+    def __init__(self, path = None):
+        self.title = None
+        self.date = None
+        self.tags = None
+        self.id = None
+        self.template = defines.postTemplate
+        self.hash = None
+        self.path = path
+        self.textOffset = None
+        self.sortKey = 0
+        self.extra = None
+
+    def __getstate__(self):
+        return tuple([getattr(self, name) for name in self.__slots__])
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def read_text(self):
+        '''Stripped non empty lines of post body'''
+        with open(self.path, 'r') as handle:
+            handle.seek(self.textOffset)
+            lines = [line.decode('utf-8').strip() for line in handle]
+        return [line for line in lines if line]
+
+    def __getitem__(self, name):
+        if name in self.fields and getattr(self, name) is not None:
+            return getattr(self, name)
+        if name == 'text' and self.textOffset is not None:
+            return self.read_text()
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        if name in self.fields:
+            setattr(self, name, value)
+            if name == 'date':
+                #integer key for sorting by date
+                self.sortKey = value.toordinal() * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def __contains__(self, name):
+        '''Checked without reading body'''
+        if name in self.fields:
+            return getattr(self, name) is not None
+        if name == 'text':
+            return self.textOffset is not None
+        return bool(self.extra) and name in self.extra
+
+    has_key = __contains__
+
+    def get(self, name, default = None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = [name for name in self.fields if getattr(self, name) is not None]
+        if self.textOffset is not None:
+            keys.append('text')
+        return keys + (self.extra.keys() if self.extra else [])
+
+    def items(self):
+        '''(name, value) of every key, reads body'''
+        return [(name, self[name]) for name in self.keys()]
+
+    def values(self):
+        '''Value of every key, reads body'''
+        return [self[name] for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    iterkeys = __iter__
+
+    def iteritems(self):
+        for name in self.keys():
+            yield name, self[name]
+
+    def itervalues(self):
+        for name in self.keys():
+            yield self[name]
+
+    def __len__(self):
+        return len(self.keys())
+
+    def update(self, values = (), **kwargs):
+        if hasattr(values, 'keys'):
+            values = [(name, values[name]) for name in values.keys()]
+        for name, value in list(values) + kwargs.items():
+            self[name] = value
+
+    #sorting in templates, generator sorts by sortKey
+    def __lt__(self, other):
+        return self.sortKey < other.sortKey
+
+
 robotsTemplate ='''user-agent: *
 %for path in disallow_list:
 disallow: ${path}
@@ -142,7 +164,7 @@ disallow: ${path}
 ''' 
 
 class MGEN(object):
-    def __init__(self, options):
+    def __init__(self, options, backend = None):
         if options.debug:
             logging.basicConfig(level = logging.DEBUG)
 
@@ -150,7 +172,7 @@ class MGEN(object):
         
         helpers.webroot = options.webroot
         
-        print 'Mr.Hide ver. %s' % __version__
+        print 'Mr.Hide ver. %s' % '.'.join([str(part) for part in __version__])
         print 'Building website for:'
         print '  %s [%s]' % ( options.title, options.url + options.webroot )
         print '  Source               : %s' % options.source
@@ -167,13 +189,50 @@ class MGEN(object):
         print '  Pages                : %s' % yesno( not options.skip_pages)
         print '  Tags                 : %s' % yesno( not options.skip_tags)
         print '  Resources            : %s' % yesno( not options.skip_tags)
+        print '  Incremental          : %s' % yesno( not options.full)
+        print '  Rendering processes  : %d' % options.jobs
+        print '  Hardlink copies      : %s' % yesno( options.hardlinks )
+        print '  Gzip copies          : %s' % yesno( options.gzip )
+        print '  Fingerprints         : %s' % yesno( options.fingerprint )
+        print '  Profile report       : %s' % (options.profile or 'no')
+        print '  Low memory           : %s' % yesno( options.low_memory )
+        print '  Tar archive          : %s' % (options.tar or 'no')
+        
+        if not options.cache:
+            options.cache = os.path.join(options.source, defines.cache)
+        helpers.markdownCacheFolder = os.path.join(options.cache, defines.markdownCache)
         
         self.tagsMap = {}
         self.pagesMap = {}
         self.miscPages = []
-        self.templates = TemplateLookup(directories=[ os.path.join(self.options.source, defines.inTemplates) ],
-                                        output_encoding='utf-8',
-                                        encoding_errors='replace')
+        self.templates = render.template_lookup(self.options)
+        self.pool = None
+        self.chunk = []
+        self.jobs = collections.deque()
+        self.profiler = profiler.Profiler()
+        #output backend given by caller, otherwise one of options is opened by every build
+        self.outputBackend = backend
+        self.backend = None
+        #manifest & post cache of last build, kept in memory by watch mode unless with --low-memory
+        self.keepBuilt = options.watch and not options.low_memory
+        self.built = None
+        self.postCache = None
+        self.sourceHashes = {}
+        self.changed = None
+        self.postOutputs = {}
+        self.outputKeys = {}
+        #ids of posts which files changed since the previous build
+        self.changedPosts = set()
+        #posts of the last build by file, generators of its outputs & first page copies, watch mode
+        #generates outputs of edited posts again with them unless the last build failed
+        self.builtPosts = {}
+        self.recipes = {}
+        self.indexCopies = {}
+        self.updatable = False
+        #tables of every output of --low-memory build, in files with its runs
+        self.tables = []
+        if options.low_memory:
+            helpers.limit_caches()
         
     def title(self, post, value):
         if value is None or len(value) == 0:
@@ -211,39 +270,46 @@ class MGEN(object):
 
     def parse_post(self, filename):
         logging.debug('Parsing %s' % filename)
-        post = Post()
+        post = Post(filename)
         with open(filename, 'r') as handle:
-            lines = handle.readlines()
-            reading_text = False
-            for line in lines:
-                line = line.decode('utf-8').strip()
-                if not line: continue
-                if reading_text:
-                    post['text'].append(line)
-                elif line == '---':
-                    reading_text = True
-                    post['text'] = []
-                else:
-                    name, d, value = [ token.strip() for token in line.partition(':')]
-                    logging.debug("setting attribute %s = %s" % (name, value))
-                    if hasattr(self, name.encode('utf-8')):
-                        getattr(self, name)(post, value.encode('utf-8'))
-                    else:
-                        post[name] = value
+            content = handle.read()
+        post['hash'] = manifest.hash_data(content)
+        #header only, body is read by post when needed
+        offset = 0
+        for line in content.splitlines(True):
+            offset += len(line)
+            line = line.decode('utf-8').strip()
+            if not line: continue
+            if line == '---':
+                post.textOffset = offset
+                break
+            name, d, value = [ token.strip() for token in line.partition(':')]
+            logging.debug("setting attribute %s = %s" % (name, value))
+            if hasattr(self, name.encode('utf-8')):
+                getattr(self, name)(post, value.encode('utf-8'))
+            else:
+                post[name] = value
                     
-        if not 'title' in post.keys():
+        if not 'title' in post:
             print 'Oups, post %s has no title!' % filename
             sys.exit(-1)
-        if not 'text' in post.keys():
+        if not 'text' in post:
             print 'Oups, post %s has no text!' % filename
             sys.exit(-1)
-        if not 'date' in post.keys():
+        if not 'date' in post:
             print 'Oups, post %s has no date!' % filename
             sys.exit(-1)
 
         if not post.get('id'):
             post['id'] = self.get_post_id(post)
         return post
+
+    def read_post(self, filename):
+        '''Parsed post from the post cache, files are parsed only if changed.
+        Post cache keeps every post, it is not used with --low-memory'''
+        if self.options.low_memory:
+            return self.parse_post(filename)
+        return self.postCache.get(filename, self.parse_post, self.is_changed(filename))
         
     def get_post_id(self, post):
         postId = post['title']
@@ -252,63 +318,180 @@ class MGEN(object):
                 postId = postId.replace(ch, '-')        
         return helpers.tr(postId)
         
+    def is_changed(self, path):
+        '''True if source file may have changed since the last build of this process'''
+        return self.changed is None or path in self.changed
+    
+    def changed_files(self, folder):
+        '''Source files in folder which may have changed since the last build of this process,
+        None if every file may have'''
+        if self.changed is None:
+            return None
+        prefix = os.path.join(folder, '')
+        return [path for path in self.changed if path.startswith(prefix)]
+    
+    def source_hashes(self, folder):
+        '''{relative path: hash} of files in source folder, only changed files are hashed
+        again after a build of this process'''
+        hashes = self.sourceHashes.get(folder)
+        if hashes is None or self.changed is None:
+            hashes = manifest.hash_tree(folder)
+        else:
+            hashes = manifest.update_hashes(hashes, folder, self.changed_files(folder))
+        self.sourceHashes[folder] = hashes
+        return hashes
+    
+    def fingerprint_resources(self):
+        '''Map of resource path to its fingerprinted path, helpers.resource() links to'''
+        self.resourceMap = {}
+        if self.options.fingerprint:
+            inputResourcesFolder = os.path.join(self.options.source, defines.inResources)
+            for path, sha in self.source_hashes(inputResourcesFolder).items():
+                self.resourceMap[path] = sync.fingerprint_name(path, sha)
+        helpers.resourceMap = self.resourceMap
+
     def generate_resources(self):
+        resourcesManifestPath = os.path.join(self.options.target, defines.resourcesManifest)
         if self.options.skip_resources:
+            if self.options.fingerprint and self.output_exists(resourcesManifestPath):
+                self.keep_output(resourcesManifestPath)
             return
             
         outputResourcesFolder = os.path.join(self.options.target, defines.resources)
         print 'Generating resources'
-        if rsync_avail:
-            os.system("/usr/bin/rsync -a \"%s\" \"%s\" " % (
-                os.path.join(self.options.source, defines.inResources), 
-                outputResourcesFolder
-                ))
+        inputResourcesFolder = os.path.join(self.options.source, defines.inResources)
+        if not os.path.exists(inputResourcesFolder):
+            print '  nothing to do'
+            return
+        if self.backend.incremental and self.changed_files(inputResourcesFolder) == []:
+            print '  no changes'
+        elif self.backend.incremental:
+            copied, unchanged, removed = sync.sync_tree(inputResourcesFolder, outputResourcesFolder, self.resourceMap)
+            print '  %d resources copied, %d unchanged, %d removed' % (copied, unchanged, removed)
         else:
-            shutil.copytree(os.path.join(self.options.source, defines.inResources), outputResourcesFolder)
+            print '  %d resources copied' % sync.copy_tree(self.writer, inputResourcesFolder, outputResourcesFolder, self.resourceMap)
+        if self.options.fingerprint:
+            self.writer.write(resourcesManifestPath, json.dumps(self.resourceMap, sort_keys = True, indent = 1))
     
     def render_template(self, template, *args, **kwargs):
         try:
-            return template.render(
-                encoding = 'utf-8',
-                helpers = helpers,
-                options = self.options,
-                *args,
-                **kwargs
-            )
+            started = time.time()
+            content = render.render(template, self.options, *args, **kwargs)
+            self.profiler.template(render.template_name(template), time.time() - started)
+            return content
+        except KeyboardInterrupt:
+            raise
         except:
             print exceptions.text_error_template().render()
             sys.exit(1)
     
+    def render_file(self, path, template_file, copies = [], **kwargs):
+        '''Render template file to path and copy result to each of copies.
+        With --jobs rendering goes to worker processes in chunks of render.chunkSize jobs,
+        results are written as they are ready and at most pipeline.queueSize jobs per
+        worker are in flight'''
+        if self.pool:
+            self.chunk.append((path, template_file, copies, kwargs))
+            if len(self.chunk) >= render.chunkSize:
+                self.submit_jobs()
+            return
+        self.render_output(path, self.templates.get_template(template_file), copies, **kwargs)
+
+    def render_output(self, path, template, copies = [], **kwargs):
+        '''Render template to path and copy result to each of copies'''
+        started = time.time()
+        content = self.render_template(template, **kwargs)
+        if isinstance(content, unicode):
+            content = content.encode('utf-8', 'replace')
+        self.profiler.output(self.output_key(path), time.time() - started)
+        self.writer.write(path, content, copies)
+    
+    def submit_jobs(self):
+        '''Send chunk of jobs to workers, writes results of chunks which are done'''
+        self.jobs.append(self.pool.apply_async(render.render_jobs, (self.chunk,)))
+        self.chunk = []
+        while self.jobs and (self.jobs[0].ready() or
+                len(self.jobs) * render.chunkSize > self.options.jobs * pipeline.queueSize):
+            self.finish_jobs(self.jobs.popleft())
+    
+    def finish_jobs(self, jobs):
+        '''Write results of a chunk of jobs'''
+        for path, copies, content, error, templateFile, seconds in jobs.get():
+            if error:
+                print error
+                sys.exit(1)
+            self.profiler.template(templateFile, seconds)
+            self.profiler.output(self.output_key(path), seconds)
+            self.writer.write(path, content, copies)
+    
+    def flush_jobs(self):
+        '''Wait for every job in flight'''
+        if self.chunk:
+            self.submit_jobs()
+        while self.jobs:
+            self.finish_jobs(self.jobs.popleft())
+    
+    def keep_post(self, post):
+        '''Keep outputs of a post which file is unchanged since the last build of this process,
+        without looking at them. Returns True if outputs were kept'''
+        if self.rebuild or self.is_changed(post.path) or not post.path in self.postOutputs:
+            return False
+        outputPath, copyPath = self.postOutputs[post.path]
+        output = self.output_key(outputPath)
+        copy = self.output_key(copyPath)
+        if not output in self.previous.outputs or not copy in self.previous.outputs or \
+           not self.manifest.graph.keep_output(output, self.previous.graph):
+            return False
+        self.writer.keep(outputPath, self.previous.outputs[output])
+        self.writer.keep(copyPath, self.previous.outputs[copy])
+        return True
+    
     def generate_post(self, post):
         if self.options.skip_posts:
-            return
+            return False
+        if self.keep_post(post):
+            return False
         outputPostsFolder = os.path.join(self.options.target, defines.posts)
         postPath = os.path.join(os.path.join(outputPostsFolder, 'id', helpers.tr(post['id'])))
-        if not os.path.exists(postPath):
-            logging.debug('Generating file at %s' % postPath)
-            os.makedirs(postPath)
         postByDatePath = os.path.join(outputPostsFolder, 'date', 
             str(post['date'].year), str(post['date'].month), 
             str(post['date'].day), helpers.tr(post['id']))
-        if not os.path.exists(postByDatePath):
-            logging.debug('creating folder %s' % postByDatePath)
-            os.makedirs(postByDatePath)
+        if self.keepBuilt:
+            #outputs of the post file for later builds of this process
+            self.postOutputs[post.path] = (os.path.join(postPath, 'index.html'), os.path.join(postByDatePath, 'index.html'))
+        if not self.is_outdated(os.path.join(postPath, 'index.html'), [post], post['template']):
+            self.keep_output(os.path.join(postByDatePath, 'index.html'))
+            return False
+        logging.debug('Generating file at %s' % postPath)
+        self.backend.makedirs(postPath)
+        self.backend.makedirs(postByDatePath)
         
         logging.debug('Generating post id: %s, template: %s' % (
             post['id'], post['template'])
         )
-        with open( os.path.join(postPath, 'index.html'), 'w') as postFile:
-            template = self.templates.get_template(post['template'])
-            postFile.write(self.render_template(template, post = post))
-        shutil.copy2(os.path.abspath(os.path.join(postPath, 'index.html')), os.path.abspath(postByDatePath))
+        self.render_file(os.path.join(postPath, 'index.html'), post['template'],
+            copies = [os.path.join(postByDatePath, 'index.html')], post = post)
+        return True
         
+    def generate_skeleton(self, pages, tags):
+        '''Create folders of blog & tag pages in one batch before pages are rendered'''
+        folders = []
+        if not self.options.skip_pages:
+            outputPagesFolder = os.path.join(self.options.target, defines.pages)
+            folders.extend([os.path.join(outputPagesFolder, str(pageNumber)) for pageNumber in pages.keys()])
+        if not self.options.skip_tags:
+            outputTagsFolder = os.path.join(self.options.target, defines.tags)
+            for tag in tags:
+                for pageNumber in range(1, tagindex.page_count(tags.count(tag), self.options.posts) + 1):
+                    folders.append(os.path.join(outputTagsFolder, helpers.tr(tag), str(pageNumber)))
+        self.backend.create_folders(folders)
+
     def generate_blog_page(self, pageNumber, totalPages, page):
         if self.options.skip_pages:
             return
             
         outputPagesFolder = os.path.join(self.options.target, defines.pages)
-        if not os.path.exists(os.path.join(outputPagesFolder, str(pageNumber))):
-            os.makedirs(os.path.join(outputPagesFolder, str(pageNumber)))
+        self.backend.makedirs(os.path.join(outputPagesFolder, str(pageNumber)))
             
         pagePath = os.path.join(outputPagesFolder, str(pageNumber), 'index.html')
         logging.debug('Generating page #%d with %d posts: %s' % (pageNumber, len(page), pagePath) )
@@ -318,8 +501,7 @@ class MGEN(object):
         if self.options.skip_tags:
             return
         outputTagsFolder = os.path.join(self.options.target, defines.tags)
-        if not os.path.exists(os.path.join(outputTagsFolder, helpers.tr(tag), str(pageNumber))):
-            os.makedirs(os.path.join(outputTagsFolder, helpers.tr(tag), str(pageNumber)))
+        self.backend.makedirs(os.path.join(outputTagsFolder, helpers.tr(tag), str(pageNumber)))
         
         tmpl = defines.blogPageTemplate
         tag_tmpl = 'tag_%s.html' % tag
@@ -336,95 +518,104 @@ class MGEN(object):
             template_file = tmpl)
             
     def _generate_blog_page(self, pagePath, pageNumber, totalPages, page, filters = {}, template_file = defines.blogPageTemplate):
-        with open(pagePath, 'w') as pageFile:
-            template = self.templates.get_template(template_file)
-            pageFile.write(
-                self.render_template(template,
-                    filters = filters,
-                    pageNumber = pageNumber,
-                    totalPages = totalPages, 
-                    page = page)
-            )
+        self.add_recipe(pagePath, self._generate_blog_page, pagePath, pageNumber, totalPages, page, filters, template_file)
+        if not self.is_outdated(pagePath, page, template_file, pageNumber, totalPages, filters):
+            return
+        self.render_file(pagePath, template_file,
+            filters = filters,
+            pageNumber = pageNumber,
+            totalPages = totalPages, 
+            page = page)
         
     def generate_indexes(self, tags, posts, pages, dates, monthsByPosts):
         if self.options.skip_indexes:
             return
             
         print 'Generating indexes'
+        #pages are copied once written
+        self.writer.join()
         outputPagesFolder = os.path.join(self.options.target, defines.pages)
         outputPostsFolder = os.path.join(self.options.target, defines.posts)
         outputTagsFolder = os.path.join(self.options.target, defines.tags)
         #create '/post/' -> '/pages/1' handler
         src = os.path.join(outputPagesFolder, '1/index.html')
         dst = os.path.join(outputPostsFolder, 'index.html')
-        if os.path.exists(src):
+        if self.keepBuilt:
+            self.indexCopies[src] = dst
+        if self.output_exists(src) and (self.is_updated(src) or not self.output_exists(dst)):
             logging.debug('Link %s -> %s' % (src, dst))
-            shutil.copy2(os.path.abspath(src), os.path.abspath(dst))
+            self.writer.copy(src, dst)
+        elif self.output_exists(src):
+            self.keep_output(dst)
             
         #create '/tag/%name' -> '/tag/%name/1' handler
         for tag in tags:
             logging.debug('Generating index for tag %s' % helpers.tr(tag))
             src = os.path.join(outputTagsFolder, '%s/1/index.html' % helpers.tr(tag))
             dst = os.path.join(outputTagsFolder, '%s/index.html' % helpers.tr(tag))
+            if self.keepBuilt:
+                self.indexCopies[src] = dst
+            if not self.is_updated(src) and self.output_exists(dst):
+                self.keep_output(dst)
+                continue
             logging.debug('Link %s -> %s' % (src, dst))
-            shutil.copy2(os.path.abspath(src), os.path.abspath(dst))
+            self.writer.copy(src, dst)
             
         #create /index.html with overview
         logging.debug('Generating root index.html')
         indexPath = os.path.join(self.options.target, 'index.html')
-        with open(indexPath, 'w') as indexFile:
-            template = self.templates.get_template(defines.indexTemplate)
-            indexFile.write( self.render_template(template,
-                    tags = tags, 
-                    posts = posts,
-                    pages = pages,
-                    dates = dates,
-                    monthsByPosts = monthsByPosts) )
+        self.generate_index(indexPath, tags, posts, pages, dates, monthsByPosts)
+
+    def generate_index(self, indexPath, tags, posts, pages, dates, monthsByPosts):
+        self.add_recipe(indexPath, self.generate_index, indexPath, tags, posts, pages, dates, monthsByPosts)
+        if not self.is_outdated(indexPath, posts, tags, len(pages), monthsByPosts):
+            return
+        template = self.templates.get_template(defines.indexTemplate)
+        self.render_output(indexPath, template,
+                tags = tags, 
+                posts = posts,
+                pages = pages,
+                dates = dates,
+                monthsByPosts = monthsByPosts)
                     
-    def _generate_feed(self, feedPath, feedRoot, postSizes, posts, title, desc):
+    def _generate_feed(self, feedPath, feedRoot, posts, title, desc):
+        self.add_recipe(feedPath, self._generate_feed, feedPath, feedRoot, posts, title, desc)
+        if not self.is_outdated(feedPath, posts, feedRoot, title, desc):
+            return
         logging.debug('Generating feed with %d items: %s' % (len(posts), feedPath) )
-        feedTemplate = Template(rssTemplate)
-        with open(feedPath, 'w') as feedFile:
-            feedFile.write(self.render_template(feedTemplate,
-                title = title,
-                feedRoot = feedRoot,
-                desc = desc,
-                posts = posts,
-                os = os,
-                postSizes = postSizes).encode('utf-8', 'replace'))
+        feed = xmlstream.FeedWriter(self.writer.open(feedPath), title, self.options.url, desc, self.options.lang)
+        for post in posts:
+            feed.item(post['title'], 
+                post['date'].strftime('%a, %d %B %Y'), 
+                helpers.markdown_html(''.join(post['text'])), 
+                self.options.url + feedRoot + '/' + post['id'])
+        feed.close()
     
     def generate_feeds(self, posts, tags):
         if self.options.skip_rss:
             return
             
         print 'Generating feeds'
-        
         outputPostsFolder = os.path.join(self.options.target, defines.posts, 'id')
         outputTagsFolder = os.path.join(self.options.target, defines.tags)
         
-        if os.path.exists(outputPostsFolder):
-            postSizes = {}
-            #Get post sizes
-            for postFolder in os.listdir(outputPostsFolder):
-                if os.path.isdir(os.path.join(outputPostsFolder, postFolder)):
-                    postSizes[postFolder] = os.path.getsize(os.path.join(outputPostsFolder, postFolder, 'index.html'))
-            
+        if self.backend.isdir(outputPostsFolder):
             #Posts feed
             postsFeedPath = os.path.join(self.options.target, defines.posts, 'feed.rss')
             postsTitle = 'Posts of %s' % self.options.title
             postsDesc = 'Last %d posts of %s' % (self.options.items, self.options.title)
-            self._generate_feed(postsFeedPath, self.options.webroot + '/post/id', postSizes, posts[:self.options.items], postsTitle, postsDesc)
+            self._generate_feed(postsFeedPath, self.options.webroot + '/post/id', posts[:self.options.items], postsTitle, postsDesc)
         else:
             print '  no posts to process'
         
         #Tag feeds
-        if os.path.exists(outputTagsFolder):
-            for tag in tags.keys():
+        if self.backend.isdir(outputTagsFolder):
+            for tag, postsWithTag in tags.items():
                 tagFeedPath = os.path.join(outputTagsFolder, helpers.tr(tag), 'feed.rss')
-                postsWithTag = tags[tag]
+                tagPosts = postsWithTag[:self.options.items]
                 tagTitle = 'Posts of %s with tag %s' % (self.options.title, tag)
-                tagDesc = 'Last %d posts of %s with tag %s' % ( len(postsWithTag), self.options.title, tag)
-                self._generate_feed(tagFeedPath, self.options.webroot + '/tag/%s' % helpers.tr(tag), postSizes, postsWithTag, tagTitle, tagDesc)
+                tagDesc = 'Last %d posts of %s with tag %s' % ( len(tagPosts), self.options.title, tag)
+                self._generate_feed(tagFeedPath, self.options.webroot + '/tag/%s' % helpers.tr(tag), tagPosts, tagTitle, tagDesc)
             print '  total %d tag feeds written' % len(tags.keys())
         else:
             print '  no tags to process'
@@ -435,29 +626,53 @@ class MGEN(object):
             
         print 'Generating site map'
         siteMapPath = os.path.join(self.options.target, 'sitemap.xml')
+        if not self.is_list_outdated(siteMapPath, posts, sorted(tags.keys()), len(pages), self.miscPages, xmlstream.sitemapUrls):
+            #keep shards of site map index
+            shard = 1
+            while self.output_exists(xmlstream.shard_path(siteMapPath, shard)):
+                self.keep_output(xmlstream.shard_path(siteMapPath, shard))
+                shard += 1
+            return
 
         logging.debug('Generating site map with %d post, %d tag pages & %d pages: %s' % ( len(posts), len(tags), len(pages), siteMapPath))
-        tmpl = Template(siteMapTemplate)
-        with open(siteMapPath, 'w') as sitemapFile:
-            #Render feed template to file
-            sitemapFile.write(self.render_template(tmpl,
-                posts = posts,
-                tags = tags,
-                pages = pages,
-                miscPages = self.miscPages,
-                dates = dates
-            ).encode('utf-8', 'replace'))
+        url = lambda *parts: self.options.url + helpers.urljoin(self.options.webroot, *parts)
+        siteMap = xmlstream.SitemapWriter(self.writer, siteMapPath, url(''), xmlstream.sitemapUrls)
+        for post in posts:
+            siteMap.url(url('post/id/', post['id']))
+        for y in dates.years():
+            for m in dates.months(y):
+                for d in dates.days(y, m):
+                    siteMap.url(url('post/date/%d/%d/%d/index.html' % (y, m, d)))
+        for pageIndex in range(1, len(pages) + 1):
+            siteMap.url(url('page', str(pageIndex)))
+        for tag in tags.keys():
+            siteMap.url(url('tag', tag))
+        for page in self.miscPages:
+            siteMap.url(url(page))
+        shards = siteMap.close()
+        if shards:
+            print '  %d urls in %d site maps' % (siteMap.count, len(shards))
     
     def generate_page(self, pageFileTemplatePath):
         pageUrl = os.path.splitext(os.path.basename(pageFileTemplatePath))[0]
         pageFileOutFolder = os.path.join(self.options.target, pageUrl)
-        os.makedirs(pageFileOutFolder)
+        pageFilePath = os.path.join(pageFileOutFolder, 'index.html')
+        self.miscPages.append(pageUrl)
+        pageKey = manifest.path_key(os.path.basename(pageFileTemplatePath))
+        if not self.rebuild and self.output_exists(pageFilePath) and \
+           self.previous.pages.get(pageKey) == self.manifest.pages.get(pageKey):
+            logging.debug('Page %s is up to date' % pageUrl)
+            self.keep_output(pageFilePath)
+            return
+        self.backend.makedirs(pageFileOutFolder)
         with open(pageFileTemplatePath, 'r') as templateFile:
-            tmpl = Template(templateFile.read(), lookup = self.templates)
-            self.miscPages.append(pageUrl)
-            pageFilePath = os.path.join(pageFileOutFolder, 'index.html')
-            with open(pageFilePath, 'w') as pageFile:
-                pageFile.write(self.render_template(tmpl).encode('utf-8', 'replace'))
+            tmpl = render.inline_template(templateFile.read(), self.options, lookup = self.templates,
+                name = os.path.basename(pageFileTemplatePath))
+        self.render_output(pageFilePath, tmpl)
+        #hash of a page file is the key of its inline template, an earlier version is not used anymore
+        previousKey = self.previous.pages.get(pageKey)
+        if previousKey and previousKey != self.manifest.pages.get(pageKey):
+            render.remove_inline_template(previousKey, self.options)
     
     def generate_misc(self):
         if self.options.skip_misc:
@@ -556,11 +771,9 @@ class MGEN(object):
                 'upload': '.*'
             })
         
-        with open(sitePath, 'w') as siteFile:
-            #Render feed template to file
-            siteFile.write(yaml.dump( {'handlers' : handlers}, 
-                default_flow_style=False,
-                default_style = "'"))
+        self.writer.write(sitePath, yaml.dump( {'handlers' : handlers}, 
+            default_flow_style=False,
+            default_style = "'"))
     
     def generate_robots_txt(self):
         if self.options.skip_robots:
@@ -572,11 +785,46 @@ class MGEN(object):
         if self.options.robots_disallow:
             disallow_list = [i.strip() for i in self.options.robots_disallow.split(',')]
 
-        tmpl = Template(robotsTemplate)
-        with open(robotsPath, 'w') as robotsFile:
-            robotsFile.write(self.render_template(tmpl,
-                disallow_list = disallow_list,
-            ).encode('utf-8', 'replace'))
+        tmpl = render.inline_template(robotsTemplate, self.options, name = 'robots.txt')
+        self.render_output(robotsPath, tmpl,
+            disallow_list = disallow_list)
+
+    def generate_gzip(self):
+        '''Gzip copies of text files, compressed only if file was changed'''
+        if not self.options.gzip:
+            return
+
+        print 'Compressing files'
+        compress = lambda path: (path + '.gz', pipeline.gzip_data(self.backend.read(path)))
+        compressed = 0
+        pool = ThreadPool(pipeline.writeThreads)
+        try:
+            #files are compressed in batches, paths of every file are not listed at once
+            jobs = self.gzip_jobs()
+            while True:
+                batch = list(itertools.islice(jobs, pipeline.queueSize))
+                if not batch:
+                    break
+                for gzipPath, content in pool.imap_unordered(compress, batch):
+                    self.writer.write(gzipPath, content)
+                compressed += len(batch)
+        finally:
+            pool.close()
+            pool.join()
+        self.writer.join()
+        print '  %d files compressed' % compressed
+
+    def gzip_jobs(self):
+        '''Paths of files to compress, gzip copies of unchanged files are kept'''
+        for path, info in self.writer.files.items():
+            if not os.path.splitext(path)[1] in defines.gzipExtensions or info[0] < self.options.gzip_min_size:
+                continue
+            gzipPath = path + '.gz'
+            output = self.output_key(path)
+            if tuple(self.previous.outputs.get(output) or ()) == tuple(info) and self.output_exists(gzipPath):
+                self.keep_output(gzipPath)
+                continue
+            yield path
 
     def is_ignored_tag(self, post):
         if self.options.ignore_tag:
@@ -585,119 +833,442 @@ class MGEN(object):
                     return True
         return False
 
-    def generate(self):
+    def load_manifest(self):
+        manifestPath = os.path.join(self.options.cache, defines.manifestFile)
+        #previous manifest is loaded for a full build too, its outputs are removed if not generated again
+        if self.built:
+            self.previous = self.built
+        else:
+            self.previous = manifest.Manifest(manifestPath, self.table)
+            self.previous.load()
+        
+        self.manifest = manifest.Manifest(manifestPath, self.table)
+        self.manifest.options = manifest.hash_options(self.options)
+        self.manifest.templates = self.source_hashes(os.path.join(self.options.source, defines.inTemplates))
+        self.manifest.pages = self.source_hashes(os.path.join(self.options.source, defines.inPages))
+        self.manifest.resources = self.resourceMap
+        
+        #any change of options or templates affects every output
+        self.rebuild = self.options.full or not self.backend.incremental or \
+            not os.path.exists(self.options.target) or \
+            self.previous.options != self.manifest.options or \
+            self.previous.templates != self.manifest.templates or \
+            self.previous.resources != self.manifest.resources
+        if self.rebuild:
+            logging.debug('Regenerating everything')
+    
+    def is_outdated(self, outputPath, posts, *params):
+        '''Record posts & parameters output is made of, returns True if it has to be generated.
+        Output shows content of posts, it is generated again when any of them changes'''
+        return self._is_outdated(outputPath, posts, params, True)
+
+    def is_list_outdated(self, outputPath, posts, *params):
+        '''Same as is_outdated() for output which lists posts without their content,
+        it is generated again only when posts are added, removed or moved'''
+        return self._is_outdated(outputPath, posts, params, False)
+
+    def _is_outdated(self, outputPath, posts, params, content):
+        output = self.output_key(outputPath)
+        ids = self.manifest.graph.add_output(output, posts, params, content)
+        if self.rebuild or not self.output_exists(outputPath) or \
+           self.manifest.graph.is_changed(output, self.previous.graph) or \
+           not self.changedPosts.isdisjoint(ids):
+            return True
+        self.keep_output(outputPath)
+        return False
+
+    def add_recipe(self, outputPath, generator, *args):
+        '''Remember how output is generated, for later builds of this process'''
+        if self.keepBuilt:
+            self.recipes[self.output_key(outputPath)] = functools.partial(generator, *args)
+
+    def is_updated(self, outputPath):
+        '''True if written output differs from the one of previous build, every output does
+        when everything is regenerated'''
+        if self.rebuild:
+            return True
+        info = self.writer.files.get(outputPath)
+        return info is not None and tuple(info) != tuple(self.previous.outputs.get(self.output_key(outputPath)) or ())
+
+    def output_exists(self, outputPath):
+        '''True if output file exists. Outputs of the last build of this process and files
+        of this build are known to exist, they are not looked up in backend'''
+        if self.changed is None:
+            return self.backend.exists(outputPath)
+        return outputPath in self.writer.files or self.output_key(outputPath) in self.previous.outputs
+    
+    def output_key(self, outputPath):
+        '''Manifest key of output, its path relative to target. Keys are kept for
+        later builds of the process in watch mode'''
+        key = self.outputKeys.get(outputPath)
+        if key is not None:
+            return key
+        prefix = os.path.join(self.options.target, '')
+        if outputPath.startswith(prefix):
+            key = manifest.path_key(os.path.normpath(outputPath[len(prefix):]))
+        else:
+            key = manifest.path_key(os.path.relpath(outputPath, self.options.target))
+        if self.keepBuilt:
+            self.outputKeys[outputPath] = key
+        return key
+
+    def keep_output(self, outputPath):
+        '''Output is up to date, its size & hash are taken from previous manifest'''
+        output = self.output_key(outputPath)
+        self.writer.keep(outputPath, self.previous.outputs.get(output))
+
+    def skipped(self):
+        '''Names of skipped generators of outputs'''
+        return [name for name, value in vars(self.options).items()
+            if name.startswith('skip_') and name != 'skip_resources' and value]
+    
+    def remove_outputs(self):
+        '''Remove outputs of previous build which are not generated anymore'''
+        outputs = self.manifest.outputs
+        for path, info in self.writer.files.items():
+            outputs[self.output_key(path)] = info
+        if self.skipped():
+            #outputs of skipped generators are unknown, keep everything
+            for output, info in self.previous.outputs.items():
+                if not output in outputs:
+                    outputs[output] = info
+            return
+        if not self.backend.incremental:
+            return
+        for output in self.previous.outputs:
+            if output in outputs:
+                continue
+            logging.debug('Removing %s' % output)
+            self.writer.remove(os.path.join(self.options.target, output.encode('utf-8')))
+    
+    def generate(self, changed = None):
+        '''Build site. changed are source paths changed since the last build of this
+        process, only they are hashed & parsed again. Every stage is stopped and
+        backend is closed when build fails'''
         logging.debug('Reading site %s' % self.options.source)
+        #changes are known only after a build of this process
+        self.changed = None
+        if changed is not None and self.built:
+            self.changed = set(changed)
+        self.profiler = profiler.Profiler(self.options.profile is not None, self.options.profile_stats)
+        self.profiler.phase('setup')
+        self.runsFolder = None
+        if self.options.low_memory:
+            #posts are spilled to sorted run files, tables of outputs are kept in files next to them
+            self.runsFolder = extsort.spill_folder(self.options.cache)
+        self.backend = self.outputBackend or backends.open_backend(self.options)
+        self.writer = pipeline.Writer(self.backend, hardlink = self.options.hardlinks, files = self.table())
+        try:
+            if not self.update_posts():
+                self.build()
+        finally:
+            if self.pool:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+            self.chunk = []
+            self.jobs.clear()
+            self.writer.stop()
+            for table in self.tables:
+                table.close()
+            self.tables = []
+            if self.runsFolder:
+                shutil.rmtree(self.runsFolder, True)
+    
+    def table(self):
+        '''New table with an entry per output, a dict or a file in runs folder with --low-memory'''
+        if not self.runsFolder:
+            return {}
+        handle, path = tempfile.mkstemp(suffix = '.db', dir = self.runsFolder)
+        os.close(handle)
+        table = disktable.DiskTable(path)
+        self.tables.append(table)
+        return table
+    
+    def build(self):
         postsFolder = os.path.join(self.options.source, defines.inPosts)
+        started = time.time()
+        self.updatable = False
+        self.builtPosts = {}
+        self.recipes = {}
+        self.indexCopies = {}
+        self.fingerprint_resources()
+        self.load_manifest()
+        helpers.fragmentCache.clear()
+        if self.rebuild:
+            #every post is converted, cached html which is not read again is stale
+            helpers.markdownCache.clear()
+            #templates are loaded again, so compiled templates of the build are told by their mtime
+            self.templates = render.template_lookup(self.options)
+        self.miscPages = []
+        if self.postCache:
+            self.postCache.reuse()
+        else:
+            self.postCache = postcache.PostCache(os.path.join(self.options.cache, defines.postsCache),
+                self.manifest.options)
+            if not self.options.full and not self.options.low_memory:
+                self.postCache.load()
         
-        posts = []
-        pages = {}
-        tags = {}
-        dates = {}
-        for y in self.options.years:
-            dates[y] = {}
-            for m in range(1, 13): 
-                dates[y][m] = {}
-                for d in range(1, 32):
-                    dates[y][m][d] = []
+        if self.options.low_memory:
+            #pages, tags & archives are read from sorted runs of posts
+            posts = extsort.SortedRuns(self.runsFolder, lambda post, number: (-post.sortKey, -number))
+            archive = extsort.SortedRuns(self.runsFolder, lambda post, number: (post['date'].date(), number),
+                group = lambda key: key[0])
+            tags = extsort.Tags(self.runsFolder)
+            dates = dateindex.DateRuns(archive)
+        else:
+            posts = []
+            tags = tagindex.TagIndex()
+            dates = dateindex.DateIndex()
         
-        #Parse *.md files and populate posts list
+        if self.options.jobs > 1:
+            self.pool = multiprocessing.Pool(self.options.jobs, render.init_worker, (self.options, self.resourceMap))
+        #resources go first, pages link to their fingerprinted names
+        self.profiler.phase('resources')
+        self.generate_resources()
+        
+        #Parse *.md files in a parse stage and populate posts list
         print 'Generating posts'
+        self.profiler.phase('posts')
         total_posts = 0
-        for postFile in [p for p in os.listdir(postsFolder) if p.endswith('.md')]:
-            post = self.parse_post(os.path.join(postsFolder, postFile))
-            self.generate_post(post)
-            total_posts += 1
-            #append to tags
-            for tag in post['tags']:
-                if not tag in tags:
-                    tags[tag] = []
-                tags[tag].append(post)
-            if not self.is_ignored_tag(post):
-                #append to all posts
-                posts.append(post)
-                #append to date dicts
-                dates[post['date'].year][post['date'].month][post['date'].day].append(post)
+        self.changedPosts = set()
+        postFiles = (os.path.join(postsFolder, p) for p in os.listdir(postsFolder) if p.endswith('.md'))
+        parsed = pipeline.parse_stage(self.read_post, postFiles)
+        try:
+            for post in parsed:
+                if self.keepBuilt:
+                    self.builtPosts[post.path] = post
+                self.manifest.graph.add_post(post)
+                if self.manifest.graph.is_post_changed(post['id'], self.previous.graph):
+                    self.changedPosts.add(post['id'])
+                if self.generate_post(post):
+                    total_posts += 1
+                #append to tags
+                for tag in post['tags']:
+                    tags.add(tag, post)
+                if not self.is_ignored_tag(post):
+                    #append to all posts
+                    posts.append(post)
+                    #append to date index
+                    if post['date'].year in self.options.years:
+                        dates.add(post)
+        finally:
+            #stops parse thread of a failed build
+            parsed.close()
         print '  total %d posts written' % total_posts
-        #Sort posts by date
-        posts.sort()
-        posts.reverse()
         
         #Process posts
         print 'Building posts pages'
-        postIndex = 0
-        pageNumber = 0;
+        self.profiler.phase('pages')
         logging.debug('Posts per page: %d' % self.options.posts)
-        for post in posts:
-            if postIndex == 0 or postIndex + 1 > self.options.posts:
-                pageNumber += 1
-                postIndex = 0
-                logging.debug('Page started: %d' % pageNumber)
-                pages[pageNumber] = []
-            pages[pageNumber].append(post)
-            postIndex += 1
+        if self.options.low_memory:
+            pages = extsort.Pages(posts, self.options.posts)
+        else:
+            #Sort posts by date
+            posts.sort(key = lambda post: post.sortKey)
+            posts.reverse()
+            pages = {}
+            postIndex = 0
+            pageNumber = 0;
+            for post in posts:
+                if postIndex == 0 or postIndex + 1 > self.options.posts:
+                    pageNumber += 1
+                    postIndex = 0
+                    logging.debug('Page started: %d' % pageNumber)
+                    pages[pageNumber] = []
+                pages[pageNumber].append(post)
+                postIndex += 1
             
-        for pageNumber in pages:
-            self.generate_blog_page(pageNumber, len(pages), pages[pageNumber])
+        self.generate_skeleton(pages, tags)
+        for pageNumber, page in pages.items():
+            self.generate_blog_page(pageNumber, len(pages), page)
         print '  total %d pages written' % len(pages)
         #Process posts & build pages for tags        
-        for tag in tags:
-            postsWithTag = tags[tag]
-            
-            #Sort posts with tag by date
-            #postsWithTag.sort()
-            #postsWithTag.reverse()
-            
+        self.profiler.phase('tags')
+        #posts of a tag are sorted by date already
+        for tag, postsWithTag in tags.items():
             logging.debug('Processing tag %s with %d posts' % ( tag, len(postsWithTag) ))
-            totalPagesWithTag = len(postsWithTag) / self.options.posts
-            postPage = []
-            tagPageNumber = 1
-            postIndex = 0
-            for post in postsWithTag:
-                postPage.append(post)
-                if postIndex == self.options.posts or (postIndex + 1 == len(postsWithTag)):
-                    postPage.sort()
-                    postPage.reverse()
-                    self.generate_tag_page(tagPageNumber, totalPagesWithTag, postPage, tag)
-                    postPage = []
-                    tagPageNumber += 1
-                    
-                postIndex += 1
+            for tagPageNumber, totalPagesWithTag, postPage in tagindex.paginate(postsWithTag, self.options.posts):
+                self.generate_tag_page(tagPageNumber, totalPagesWithTag, postPage, tag)
             
         #Generate dates
         print 'Generating dates'
+        self.profiler.phase('dates')
         outputPostsFolder = os.path.join(self.options.target, defines.posts)
         totalDatePages = 0
         monthsByPosts = {}
         for y in self.options.years:
-            if not y in dates:
-                continue
-            monthsByPosts[y] = []
-            for m in range(1, 12):
-                postsByMonth = []
-                #Generate pages for days
-                for d in range(1, 31):
-                    postByDay = dates[y][m][d]
-                    if postByDay:
-                        #append to month posts
-                        [postsByMonth.append(p) for p in postByDay]
-                        postsByDayPath = os.path.join(outputPostsFolder, 'date', str(y), str(m), str(d), 'index.html')
-                        self._generate_blog_page(postsByDayPath, 1, 1, postByDay, filters = {'year' : y, 'month': m, 'day': d})
-                        totalDatePages += 1
-                        
-                #Generate page for month
-                if postsByMonth:
-                    monthsByPosts[y].append(m)
-                    postsByMonthPath = os.path.join(outputPostsFolder, 'date', str(y), str(m), 'index.html')
-                    self._generate_blog_page(postsByMonthPath, 1, 1, postsByMonth, filters = {'year' : y, 'month': m})                
-                    totalDatePages +=1
+            monthsByPosts[y] = dates.months(y)
+        #pages for days with posts, each month follows its days
+        for y, m, d, postsByDate in dates.archives():
+            if d:
+                postsByDatePath = os.path.join(outputPostsFolder, 'date', str(y), str(m), str(d), 'index.html')
+                self._generate_blog_page(postsByDatePath, 1, 1, postsByDate, filters = {'year' : y, 'month': m, 'day': d})
+            else:
+                postsByDatePath = os.path.join(outputPostsFolder, 'date', str(y), str(m), 'index.html')
+                self._generate_blog_page(postsByDatePath, 1, 1, postsByDate, filters = {'year' : y, 'month': m})
+            totalDatePages += 1
         print '  total %d date pages written' % totalDatePages
         
-        self.generate_resources()
+        if self.pool:
+            self.profiler.phase('render')
+            self.flush_jobs()
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        
+        self.profiler.phase('indexes')
         self.generate_indexes([tag for tag in tags], posts, pages, dates, monthsByPosts)
+        self.profiler.phase('feeds')
         self.generate_feeds(posts, tags)
+        self.profiler.phase('misc')
         self.generate_misc()
+        self.profiler.phase('sitemap')
         self.generate_sitemap(posts, tags, pages, dates)
+        self.profiler.phase('appengine')
         self.generate_app_engine_site()
         self.generate_robots_txt()
+        self.profiler.phase('write')
+        self.writer.join()
+        self.profiler.phase('gzip')
+        self.generate_gzip()
+        self.profiler.phase('cleanup')
+        self.remove_outputs()
+        if self.rebuild and not self.skipped():
+            #mtime of a file system may be in whole seconds
+            removed = helpers.prune_markdown_cache(int(started))
+            if removed:
+                print '  %d unused markdown cache entries removed' % removed
+            removed = render.prune_templates(self.options, int(started))
+            if removed:
+                print '  %d unused compiled templates removed' % removed
+        self.writer.close()
+        #outputs which are not kept between builds are not worth a manifest,
+        #watch mode saves state of its last build when it stops
+        self.built = self.manifest
+        if self.changed is None or not self.keepBuilt:
+            self.save_state()
+        if not self.keepBuilt:
+            #tables of --low-memory manifest are removed with the runs, next build loads it again
+            self.built = None
+        self.updatable = self.keepBuilt
+        if self.options.low_memory:
+            tags.close()
+            posts.close()
+            archive.close()
+        self.report()
+
+    def update_posts(self):
+        '''Generate again only outputs showing posts which content changed since the last build of
+        this process, if only files of existing posts changed and their ids, dates, tags & templates
+        are the same. Outputs listing the posts, like site map, other outputs and their entries in
+        manifest are left as they are. Returns False if site has to be built'''
+        if not self.updatable or not self.changed or not self.backend.incremental:
+            return False
+        for path in self.changed:
+            if not path in self.builtPosts or not os.path.isfile(path):
+                return False
+        updates = []
+        for path in sorted(self.changed):
+            built = self.builtPosts[path]
+            post = self.read_post(path)
+            for name in ['id', 'date', 'tags', 'template']:
+                if post.get(name) != built.get(name):
+                    return False
+            if post['hash'] != built['hash']:
+                updates.append((built, post))
+        changedPosts = set([built['id'] for built, post in updates])
+        outputs = self.built.graph.dependents(changedPosts)
+        for built, post in updates:
+            if built.path in self.postOutputs:
+                outputs.discard(self.output_key(self.postOutputs[built.path][0]))
+        if [output for output in outputs if not output in self.recipes]:
+            return False
+        print 'Updating posts'
+        self.profiler.phase('posts')
+        #outputs are checked against the last build and recorded in its manifest
+        self.previous = self.manifest = self.built
+        self.rebuild = False
+        self.changedPosts = changedPosts
+        #posts of the last build take content of the files, an update which fails is built again in full
+        self.updatable = False
+        helpers.fragmentCache.clear()
+        for built, post in updates:
+            built.__setstate__(post.__getstate__())
+            self.generate_post(built)
+        print '  %d posts changed' % len(updates)
+        self.profiler.phase('pages')
+        for output in sorted(outputs):
+            self.recipes[output]()
+        print '  %d outputs of posts written' % len(outputs)
+        self.profiler.phase('indexes')
+        self.writer.join()
+        for src, dst in self.indexCopies.items():
+            if self.is_updated(src):
+                self.writer.copy(src, dst)
+        self.profiler.phase('gzip')
+        self.generate_gzip()
+        self.profiler.phase('write')
+        self.writer.close()
+        for path, info in self.writer.files.items():
+            self.manifest.outputs[self.output_key(path)] = info
+        for built, post in updates:
+            self.manifest.graph.add_post(built)
+        self.updatable = True
+        self.report()
+        return True
+
+    def report(self):
+        '''Print numbers of files of the build and write its profile report'''
+        print '  %d files changed, %d unchanged, %d removed' % (
+            self.writer.changed, self.writer.unchanged, self.writer.removed)
+        if self.options.profile:
+            self.profiler.save(self.options.profile, {
+                'changed': self.writer.changed,
+                'unchanged': self.writer.unchanged,
+                'skipped': self.writer.kept,
+                'removed': self.writer.removed,
+                'bytes': self.writer.written
+            })
+            print '  profile written to %s' % self.options.profile
         
-        print 'Done.'
\ No newline at end of file
+        print 'Done.'
+
+    def save_state(self, posts = True):
+        '''Save manifest of the last build and post cache for the next run'''
+        if self.built and self.backend.incremental:
+            self.built.save()
+        if posts and not self.options.low_memory:
+            self.postCache.save()
+
+    def watch(self):
+        '''Rebuild site on every change of its sources until interrupted. Templates, parsed posts,
+        source hashes & manifest of the last build stay in memory, so only changed sources are
+        hashed & parsed and only their outputs are rendered. An edit of posts which keeps their
+        ids, dates, tags & templates only renders the outputs showing them, see update_posts().
+        Manifest & post cache are saved when watching stops. With --low-memory every build saves
+        its manifest and reads every source'''
+        self.options.full = False
+        folders = [os.path.join(self.options.source, folder) 
+            for folder in [defines.inPosts, defines.inTemplates, defines.inPages, defines.inResources]]
+        watcher = watch.Watcher(folders, self.options.watch_interval)
+        print 'Watching %s for changes, Ctrl+C to stop' % self.options.source
+        changed = set()
+        try:
+            while True:
+                changed.update(watcher.wait())
+                print '%d source files changed' % len(changed)
+                started = time.time()
+                try:
+                    self.generate(changed)
+                except SystemExit:
+                    #changes of a failed build are built again with the next ones
+                    print 'Build failed, waiting for changes'
+                    continue
+                changed = set()
+                print 'Rebuilt in %.2f s' % (time.time() - started)
+        except KeyboardInterrupt:
+            print 'Stopped watching'
+        finally:
+            #manifest & post cache are saved once, post cache of a failed build misses posts
+            self.save_state(not changed)
\ No newline at end of file
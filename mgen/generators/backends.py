@@ -0,0 +1,350 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import time
+import shutil
+import filecmp
+import tarfile
+import logging
+import tempfile
+import threading
+import StringIO
+
+import manifest
+
+# Size of a streamed tar member kept in memory, larger members are spooled to a temporary file
+tarSpoolSize = 1024 * 1024
+
+# Folders known to exist kept by a file backend of --low-memory build
+folderCacheSize = 4096
+
+
+def same_content(path, content):
+    '''True if file at path has exactly the content'''
+    try:
+        if os.path.getsize(path) != len(content):
+            return False
+        with open(path, 'rb') as existingFile:
+            return existingFile.read() == content
+    except (IOError, OSError):
+        return False
+
+def copy_file(path, copy, hardlink = False):
+    '''Copy file to copy path. With hardlink the copy is a hardlink of the file,
+    or a real copy where hardlinks are not supported. An identical copy is not
+    touched. Returns True if copy was changed'''
+    if os.path.exists(copy):
+        if os.path.samefile(path, copy):
+            return False
+        if not hardlink and filecmp.cmp(path, copy, shallow = False):
+            return False
+    if hardlink:
+        try:
+            if os.path.exists(copy):
+                os.remove(copy)
+            os.link(path, copy)
+            return True
+        except OSError, e:
+            logging.debug('Cannot link %s to %s: %s' % (copy, path, e))
+    shutil.copy2(os.path.abspath(path), os.path.abspath(copy))
+    return True
+
+def write_file(path, content):
+    '''Write content to path unless the file has it already, so unchanged files
+    keep their modification time. Returns True if file was changed'''
+    if same_content(path, content):
+        return False
+    with open(path, 'w') as outputFile:
+        outputFile.write(content)
+    return True
+
+
+class FileBackend(object):
+    '''Output files in root folder. Files of the previous build are kept,
+    so builds to a folder are incremental.
+    Folders are created through a cache of folders known to exist and of names in
+    listed folders, so a folder costs one listing of its parent instead of a stat.
+    With cacheSize, folders are not listed, a stat tells if a folder exists and at most
+    cacheSize folders known to exist are cached'''
+
+    incremental = True
+
+    def __init__(self, root, cacheSize = None):
+        self.root = root
+        self.cacheSize = cacheSize
+        self.folders = set()
+        self.listings = {}
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def isdir(self, path):
+        return path in self.folders or os.path.isdir(path)
+
+    def listing(self, folder):
+        '''Names in folder, listed once'''
+        names = self.listings.get(folder)
+        if names is None:
+            try:
+                names = set(os.listdir(folder or '.'))
+            except OSError:
+                names = set()
+            self.listings[folder] = names
+        return names
+
+    def makedirs(self, path):
+        if path in self.folders:
+            return
+        if self.cacheSize:
+            if len(self.folders) >= self.cacheSize:
+                self.folders.clear()
+            if not os.path.isdir(path):
+                try:
+                    os.makedirs(path)
+                except OSError:
+                    if not os.path.isdir(path):
+                        raise
+            self.folders.add(path)
+            return
+        parent, name = os.path.split(path)
+        if not name:
+            #root of file system or trailing separator
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        else:
+            if parent:
+                self.makedirs(parent)
+            names = self.listing(parent)
+            if not name in names:
+                try:
+                    os.mkdir(path)
+                    self.listings[path] = set()
+                except OSError:
+                    #made since parent was listed
+                    if not os.path.isdir(path):
+                        raise
+                names.add(name)
+        self.folders.add(path)
+
+    def create_folders(self, folders):
+        '''Create folders in a batch, parents are listed once and only missing folders are made'''
+        for folder in sorted(set(folders)):
+            self.makedirs(folder)
+
+    def write(self, path, content):
+        '''Write content to path, returns True if file was changed'''
+        return write_file(path, content)
+
+    def copy(self, path, copy, hardlink = False):
+        '''Copy written file, returns True if copy was changed'''
+        return copy_file(path, copy, hardlink)
+
+    def create(self, path):
+        '''Handle to write file at path in parts, written by commit()'''
+        return open('%s.%d.tmp' % (path, os.getpid()), 'wb')
+
+    def commit(self, path, handle):
+        '''Write file from handle of create(), returns True if file was changed'''
+        handle.close()
+        if os.path.isfile(path) and filecmp.cmp(handle.name, path, shallow = False):
+            os.remove(handle.name)
+            return False
+        os.rename(handle.name, path)
+        return True
+
+    def read(self, path):
+        with open(path, 'rb') as handle:
+            return handle.read()
+
+    def info(self, path):
+        '''(size, hash) of written file'''
+        return (os.path.getsize(path), manifest.hash_file(path))
+
+    def remove(self, path):
+        '''Remove file and its empty folders up to root. Returns True if file was removed'''
+        if not os.path.isfile(path):
+            return False
+        os.remove(path)
+        folder = os.path.dirname(path)
+        while os.path.abspath(folder) != os.path.abspath(self.root) and not os.listdir(folder):
+            os.rmdir(folder)
+            self.folders.discard(folder)
+            self.listings.pop(folder, None)
+            parent, name = os.path.split(folder)
+            if parent in self.listings:
+                self.listings[parent].discard(name)
+            folder = parent
+        return True
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(object):
+    '''Output files kept in memory by path, for tests and previews.
+    Every build starts from nothing'''
+
+    incremental = False
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+        self.folders = set()
+
+    def exists(self, path):
+        return path in self.files or path in self.folders
+
+    def isdir(self, path):
+        return path in self.folders
+
+    def makedirs(self, path):
+        while path and path != self.root and not path in self.folders:
+            self.folders.add(path)
+            path = os.path.dirname(path)
+
+    def create_folders(self, folders):
+        for folder in folders:
+            self.makedirs(folder)
+
+    def write(self, path, content):
+        self.makedirs(os.path.dirname(path))
+        changed = self.files.get(path) != content
+        self.files[path] = content
+        return changed
+
+    def copy(self, path, copy, hardlink = False):
+        return self.write(copy, self.files[path])
+
+    def create(self, path):
+        return StringIO.StringIO()
+
+    def commit(self, path, handle):
+        content = handle.getvalue()
+        handle.close()
+        return self.write(path, content)
+
+    def read(self, path):
+        if not path in self.files:
+            raise IOError('No such file: %s' % path)
+        return self.files[path]
+
+    def info(self, path):
+        content = self.read(path)
+        return (len(content), manifest.hash_data(content))
+
+    def remove(self, path):
+        return self.files.pop(path, None) is not None
+
+    def close(self):
+        pass
+
+
+class TarBackend(object):
+    '''Output files streamed to a tar archive, path of a file in archive is relative to root.
+    Archive is compressed with gzip unless its name ends with .tar or .bz2.
+    Copies are hardlinks in archive. Files cannot be read back once written.
+    Archive - is streamed to standard output of the process, sys.__stdout__, status
+    output of the build has to go elsewhere'''
+
+    incremental = False
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        if path.endswith('.tar'):
+            mode = 'w|'
+        elif path.endswith('.bz2') or path.endswith('.tbz2'):
+            mode = 'w|bz2'
+        else:
+            mode = 'w|gz'
+        if path == '-':
+            self.handle = sys.__stdout__
+        else:
+            self.handle = open(path, 'wb')
+        self.tar = tarfile.open(mode = mode, fileobj = self.handle)
+        self.lock = threading.Lock()
+        self.mtime = time.time()
+        self.members = set()
+        self.folders = set()
+
+    def name(self, path):
+        return os.path.relpath(path, self.root)
+
+    def member(self, path, size):
+        info = tarfile.TarInfo(self.name(path))
+        info.size = size
+        info.mtime = self.mtime
+        info.mode = 0644
+        return info
+
+    def exists(self, path):
+        return path in self.members or path in self.folders
+
+    def isdir(self, path):
+        return path in self.folders
+
+    def makedirs(self, path):
+        #folders are created from names of files on extraction
+        while path and path != self.root and not path in self.folders:
+            self.folders.add(path)
+            path = os.path.dirname(path)
+
+    def create_folders(self, folders):
+        for folder in folders:
+            self.makedirs(folder)
+
+    def add(self, path, info, handle = None):
+        with self.lock:
+            self.tar.addfile(info, handle)
+            self.members.add(path)
+            self.makedirs(os.path.dirname(path))
+
+    def write(self, path, content):
+        self.add(path, self.member(path, len(content)), StringIO.StringIO(content))
+        return True
+
+    def copy(self, path, copy, hardlink = False):
+        info = self.member(copy, 0)
+        info.type = tarfile.LNKTYPE
+        info.linkname = self.name(path)
+        self.add(copy, info)
+        return True
+
+    def create(self, path):
+        return tempfile.SpooledTemporaryFile(tarSpoolSize)
+
+    def commit(self, path, handle):
+        size = handle.tell()
+        handle.seek(0)
+        self.add(path, self.member(path, size), handle)
+        handle.close()
+        return True
+
+    def read(self, path):
+        raise IOError('Cannot read %s streamed to %s' % (path, self.path))
+
+    def info(self, path):
+        raise IOError('Cannot read %s streamed to %s' % (path, self.path))
+
+    def remove(self, path):
+        return False
+
+    def close(self):
+        self.tar.close()
+        if self.handle is sys.__stdout__:
+            self.handle.flush()
+        else:
+            self.handle.close()
+
+
+def open_backend(options):
+    '''Backend for output of a build with options'''
+    if options.tar:
+        return TarBackend(options.target, options.tar)
+    if options.low_memory:
+        return FileBackend(options.target, folderCacheSize)
+    return FileBackend(options.target)
@@ -0,0 +1,6 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+# Generator benchmarks
+#
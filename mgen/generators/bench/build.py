@@ -0,0 +1,172 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+# Benchmark of site builds on synthetic sites, full build, no-op rebuild and rebuild
+# after a change of one post, with time per phase, throughput and peak RSS:
+#   python -m mgen.generators.bench.build [--posts 1000,10000] [--jobs 1] [--low-memory]
+#       [--save result.json] [--baseline baseline.json [--tolerance 0.2]]
+#
+# Exits with 1 if a build is slower or takes more memory than in baseline.
+#
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import optparse
+import tempfile
+import resource
+import multiprocessing
+
+import mgen.generators
+from mgen.generators import defines
+from mgen.generators.bench import corpus
+
+# Builds of every site, in order
+builds = ['full', 'noop', 'edit']
+
+# Metrics compared with baseline, larger is worse
+compared = ['wall', 'cpu', 'rss']
+
+
+def build_options(source, target, **kwargs):
+    '''Generator options as set by mgen.cmd with defaults'''
+    options = optparse.Values(dict(debug = False, source = source, target = target,
+        url = 'http://localhost', webroot = '/', posts = 10, items = 30, title = 'Bench',
+        years = [], lang = 'en', use24hours = True, transliterate = True, ignore_tag = [],
+        clear = False, full = False, cache = None, jobs = 1, hardlinks = False,
+        gzip = False, gzip_min_size = 512, fingerprint = False, watch = False, watch_interval = 0.5,
+        profile = None, profile_stats = False, low_memory = False, tar = None, skip_posts = False, skip_pages = False,
+        skip_tags = False, skip_rss = False, skip_resources = False, skip_indexes = False,
+        skip_sitemap = False, skip_misc = False, skip_gae = False, skip_robots = False,
+        robots_disallow = None))
+    for name, value in kwargs.items():
+        setattr(options, name, value)
+    return options
+
+def run_build(options, posts, connection):
+    '''Build site in a process of its own, so peak RSS is of this build only.
+    Sends result to connection'''
+    #generator output is not a part of the benchmark
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    try:
+        started = time.time()
+        startedCpu = os.times()
+        mgen.generators.MGEN(options).generate()
+        wall = time.time() - started
+        times = os.times()
+        with open(options.profile, 'r') as handle:
+            report = json.load(handle)
+        files = report['files']
+        connection.send({
+            'wall': wall,
+            'cpu': sum(times[:4]) - sum(startedCpu[:4]),
+            'rss': max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss),
+            'phases': dict([(phase['name'], phase['wall']) for phase in report['phases']]),
+            'files': files,
+            'postsPerSecond': posts / wall,
+            'filesPerSecond': files['changed'] / wall
+        })
+    except BaseException, e:
+        connection.send({'error': '%s: %s' % (e.__class__.__name__, e)})
+    finally:
+        connection.close()
+
+def measure(options, posts):
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target = run_build, args = (options, posts, sender))
+    process.start()
+    result = receiver.recv()
+    process.join()
+    if 'error' in result:
+        raise RuntimeError('Build of %s failed, %s' % (options.source, result['error']))
+    return result
+
+def run_site(folder, posts, jobs, lowMemory, siteArguments):
+    '''Results of every build of a site with posts, by build'''
+    source = os.path.join(folder, 'site')
+    target = os.path.join(folder, 'out')
+    corpus.make_site(source, posts, **siteArguments)
+    shutil.rmtree(target, True)
+    results = {}
+    for build in builds:
+        if build == 'edit':
+            with open(os.path.join(source, defines.inPosts, 'post%06d.md' % (posts / 2)), 'a') as handle:
+                handle.write('\nOne more paragraph.\n')
+        options = build_options(source, target, jobs = jobs, full = build == 'full', low_memory = lowMemory,
+            years = siteArguments['years'], profile = os.path.join(folder, 'profile.json'))
+        results[build] = measure(options, posts)
+        print '%8d %6s %10.2f %10.2f %10.1f %10d %10d' % (posts, build, results[build]['wall'],
+            results[build]['cpu'], results[build]['postsPerSecond'], results[build]['files']['changed'],
+            results[build]['rss'] / 1024)
+    return results
+
+def compare(result, baseline, tolerance):
+    '''Print change of metrics against baseline, returns list of regressions'''
+    regressions = []
+    print 'Compared to baseline:'
+    for posts in sorted(result['sites'], key = int):
+        for build in builds:
+            current = result['sites'][posts].get(build)
+            base = baseline['sites'].get(posts, {}).get(build)
+            if not current or not base:
+                continue
+            for metric in compared:
+                if not base[metric]:
+                    continue
+                ratio = float(current[metric]) / base[metric]
+                worse = ratio > 1 + tolerance
+                print '%8s %6s %6s %+8.1f%%%s' % (posts, build, metric, (ratio - 1) * 100,
+                    worse and '  REGRESSION' or '')
+                if worse:
+                    regressions.append((posts, build, metric, ratio))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option("--posts", default = "1000,10000", help = "Comma separated numbers of posts of benchmark sites. Default is 1000,10000.")
+    parser.add_option("-j", "--jobs", type = "int", default = 1, help = "Number of rendering processes. Default is 1.")
+    parser.add_option("--low-memory", action = "store_true", default = False, help = "Build sites with --low-memory.")
+    parser.add_option("--folder", help = "Folder for sites and outputs. Default is a temporary folder, removed after the run.")
+    parser.add_option("--save", help = "Write results to a JSON file, to be used as a baseline.")
+    parser.add_option("--baseline", help = "Compare results with JSON file written by --save.")
+    parser.add_option("--tolerance", type = "float", default = 0.2, help = "Allowed relative increase of time & memory against baseline. Default is 0.2.")
+    corpus.add_options(parser)
+    (options, args) = parser.parse_args()
+
+    siteArguments = corpus.site_arguments(options)
+    folder = options.folder or tempfile.mkdtemp(prefix = 'mgen-bench-')
+    result = {
+        'version': '.'.join([str(part) for part in mgen.generators.__version__]),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': multiprocessing.cpu_count(),
+        'jobs': options.jobs,
+        'lowMemory': options.low_memory,
+        'site': siteArguments,
+        'sites': {}
+    }
+    print '%8s %6s %10s %10s %10s %10s %10s' % ('posts', 'build', 'wall, s', 'cpu, s', 'posts/s', 'written', 'rss, MB')
+    try:
+        for posts in [int(p.strip()) for p in options.posts.split(',')]:
+            result['sites'][str(posts)] = run_site(folder, posts, options.jobs, options.low_memory, siteArguments)
+    finally:
+        if not options.folder:
+            shutil.rmtree(folder, True)
+
+    if options.save:
+        with open(options.save, 'w') as handle:
+            json.dump(result, handle, indent = 1, sort_keys = True)
+    if options.baseline:
+        with open(options.baseline, 'r') as handle:
+            baseline = json.load(handle)
+        if baseline.get('site') != json.loads(json.dumps(siteArguments)):
+            print 'Warning: baseline sites were built with other arguments %s' % baseline.get('site')
+        if compare(result, baseline, options.tolerance):
+            sys.exit(1)
@@ -0,0 +1,132 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+# Synthetic site sources for benchmarks:
+#   python -m mgen.generators.bench.corpus <folder> [--posts 1000] [--tags 50] [--tags-per-post 3]
+#       [--body-size 4] [--years 2012,2013] [--templates 1]
+#
+
+import os
+import random
+import shutil
+import optparse
+
+from mgen.generators import defines
+from mgen.generators.bench.cut import words
+
+baseTemplate = '''<html><head><title>${options.title}</title>
+<link rel="stylesheet" href="${helpers.resource('css/site.css')}"/></head>
+<body>${self.body()}</body></html>
+'''
+
+postTemplate = '''<%%inherit file="base.html"/>
+<h1 class="post-%d">${post['title']}</h1><p>${helpers.format_timestamp(post['date'])}</p>
+<div>${helpers.text(post)}</div>
+%%for tag in post['tags']:
+<a href="${helpers.link('tag/' + tag)}">${tag}</a>
+%%endfor
+'''
+
+pageTemplate = '''<%inherit file="base.html"/>
+<%def name="summary(post, size)"><div class="summary"><h3><a href="${helpers.link('post/id/' + post['id'])}">${post['title']}</a></h3>
+${helpers.cut(helpers.text(post), size)}</div></%def>
+<h2>Page ${pageNumber} of ${totalPages}</h2>
+%for post in page:
+${helpers.cached_fragment(context, post, summary, post, 300)}
+%endfor
+'''
+
+indexTemplate = '''<%inherit file="base.html"/>
+%for post in posts[:10]:
+<p><a href="${helpers.link('post/id/' + post['id'])}">${post['title']}</a></p>
+%endfor
+%for tag in tags:
+<a href="${helpers.link('tag/' + tag)}">${tag}</a>
+%endfor
+%for y in sorted(monthsByPosts):
+%for m in monthsByPosts[y]:
+<a href="${helpers.link('post/date/%d/%d' % (y, m))}">${helpers.MonthNames[m]} ${y}</a>
+%endfor
+%endfor
+'''
+
+aboutPage = '''<%inherit file="base.html"/>
+<p>About ${options.title}</p>
+'''
+
+
+def post_body(rnd, size):
+    '''Markdown text of about size bytes'''
+    paragraphs = []
+    total = 0
+    while total < size:
+        paragraph = ' '.join([rnd.choice(words) for index in range(rnd.randint(20, 80))]) + '.'
+        if rnd.random() < 0.3:
+            paragraph += ' Some *emphasis* and a [link](http://example.com/%d).' % rnd.randint(0, 1000)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return '\n\n'.join(paragraphs)
+
+def make_site(folder, posts = 1000, tags = 50, tagsPerPost = 3, bodySize = 4096,
+        years = [2012, 2013], templates = 1, seed = 0):
+    '''Write sources of a site with posts spread over years, each with up to tagsPerPost
+    of tags and a body of about bodySize bytes, rendered by one of templates post templates.
+    Existing folder is replaced. Same arguments give the same site'''
+    rnd = random.Random(seed)
+    shutil.rmtree(folder, True)
+    for name in [defines.inPosts, defines.inTemplates, defines.inPages,
+            os.path.join(defines.inResources, 'css'), os.path.join(defines.inResources, 'js')]:
+        os.makedirs(os.path.join(folder, name))
+    tagNames = ['tag%d' % index for index in range(tags)]
+    for index in range(posts):
+        date = '%02d.%02d.%d, %02d.%02d' % (rnd.randint(1, 28), rnd.randint(1, 12), rnd.choice(years),
+            rnd.randint(0, 23), rnd.randint(0, 59))
+        postTags = rnd.sample(tagNames, rnd.randint(1, min(tagsPerPost, tags))) if tags else []
+        with open(os.path.join(folder, defines.inPosts, 'post%06d.md' % index), 'w') as handle:
+            handle.write('title: Post %d %s\n' % (index, ' '.join(rnd.sample(words, 3))))
+            handle.write('date: %s\n' % date)
+            handle.write('tags: %s\n' % ', '.join(postTags))
+            if index % templates:
+                handle.write('template: post%d.html\n' % (index % templates))
+            handle.write('---\n')
+            handle.write(post_body(rnd, bodySize) + '\n')
+
+    templatesFolder = os.path.join(folder, defines.inTemplates)
+    for name, content in [('base.html', baseTemplate), (defines.blogPageTemplate, pageTemplate),
+            (defines.indexTemplate, indexTemplate), (defines.postTemplate, postTemplate % 0)]:
+        with open(os.path.join(templatesFolder, name), 'w') as handle:
+            handle.write(content)
+    for index in range(1, templates):
+        with open(os.path.join(templatesFolder, 'post%d.html' % index), 'w') as handle:
+            handle.write(postTemplate % index)
+    with open(os.path.join(folder, defines.inPages, 'about.html'), 'w') as handle:
+        handle.write(aboutPage)
+    with open(os.path.join(folder, defines.inResources, 'css', 'site.css'), 'w') as handle:
+        handle.write('body { color: black }\n' * 100)
+    with open(os.path.join(folder, defines.inResources, 'js', 'site.js'), 'w') as handle:
+        handle.write('var site = {};\n' * 100)
+
+
+def add_options(parser):
+    parser.add_option("--tags", type = "int", default = 50, help = "Number of distinct tags. Default is 50.")
+    parser.add_option("--tags-per-post", type = "int", default = 3, help = "Most tags of a post. Default is 3.")
+    parser.add_option("--body-size", type = "int", default = 4, help = "Post body size in KB. Default is 4.")
+    parser.add_option("--years", default = "2012,2013", help = "Comma separated years of posts. Default is 2012,2013.")
+    parser.add_option("--templates", type = "int", default = 1, help = "Number of post templates. Default is 1.")
+
+def site_arguments(options):
+    '''make_site keyword arguments from parsed options'''
+    return dict(tags = options.tags, tagsPerPost = options.tags_per_post,
+        bodySize = options.body_size * 1024, templates = max(1, options.templates),
+        years = [int(y.strip()) for y in options.years.split(',')])
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage = '%prog [options] folder')
+    parser.add_option("--posts", type = "int", default = 1000, help = "Number of posts. Default is 1000.")
+    add_options(parser)
+    (options, args) = parser.parse_args()
+    if len(args) != 1:
+        parser.error('No folder specified')
+    make_site(args[0], options.posts, **site_arguments(options))
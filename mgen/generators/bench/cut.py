@@ -0,0 +1,60 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+# Benchmark of texthlp.cut on large posts:
+#   python -m mgen.generators.bench.cut [--sizes 10,100,1000] [--length 300]
+#
+
+import random
+import timeit
+import optparse
+
+from mgen.generators import texthlp
+
+words = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'.split()
+
+
+def html_post(size, seed = 0, markup = True):
+    '''Markdown-like html of about size bytes, plain text without markup'''
+    rnd = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < size:
+        tokens = []
+        for index in range(rnd.randint(40, 120)):
+            word = rnd.choice(words)
+            kind = rnd.random() if markup else 1
+            if kind < 0.05:
+                word = '<em>%s</em>' % word
+            elif kind < 0.08:
+                word = '<a href="http://example.com/%d">%s</a>' % (index, word)
+            elif kind < 0.09:
+                word = '%s &amp;' % word
+            tokens.append(word)
+        paragraph = ('<p>%s.</p>' if markup else '%s.') % ' '.join(tokens)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 1
+    return '\n'.join(paragraphs)
+
+
+def run(sizes, length, repeat):
+    print '%6s %10s %10s %12s %12s' % ('text', 'size, KB', 'cut at', 'usec/call', 'result len')
+    for markup in [True, False]:
+        for size in sizes:
+            text = html_post(size * 1024, markup = markup)
+            for cutAt in [length, len(text) / 2]:
+                timer = timeit.Timer(lambda: texthlp.cut(text, cutAt))
+                number = max(1, repeat / size)
+                best = min(timer.repeat(3, number)) / number
+                print '%6s %10d %10d %12.1f %12d' % (markup and 'html' or 'plain', size, cutAt,
+                    best * 1e6, len(texthlp.cut(text, cutAt)))
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option("--sizes", default = "10,100,1000", help = "Comma separated post sizes in KB. Default is 10,100,1000.")
+    parser.add_option("--length", type = "int", default = 300, help = "Excerpt length. Default is 300.")
+    parser.add_option("--repeat", type = "int", default = 1000, help = "Calls per KB of post size. Default is 1000.")
+    (options, args) = parser.parse_args()
+    run([int(s.strip()) for s in options.sizes.split(',')], options.length, options.repeat)
@@ -0,0 +1,117 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import itertools
+
+import extsort
+
+
+def archives(posts):
+    '''Yields (year, month, day, posts) for every day with posts, followed by
+    (year, month, None, posts) for its month, from posts in date order'''
+    for (year, month), ofMonth in itertools.groupby(posts, lambda post: (post['date'].year, post['date'].month)):
+        monthPosts = []
+        for day, dayPosts in itertools.groupby(ofMonth, lambda post: post['date'].day):
+            dayPosts = list(dayPosts)
+            monthPosts.extend(dayPosts)
+            yield year, month, day, dayPosts
+        yield year, month, None, monthPosts
+
+
+class Level(dict):
+    '''Level of a sparse index. A missing key reads as an empty value made by empty(),
+    the value is not added, so only keys with posts are listed'''
+
+    def __init__(self, empty):
+        dict.__init__(self)
+        self.empty = empty
+
+    def __missing__(self, key):
+        return self.empty()
+
+    def child(self, key):
+        '''Value of key, added if missing'''
+        if not dict.__contains__(self, key):
+            self[key] = self.empty()
+        return dict.__getitem__(self, key)
+
+
+class DateIndex(object):
+    '''Sparse index of posts by date, year -> month -> day -> posts.
+    Only days with posts are kept, posts of a day are in order they were added.
+    Supports dates[y][m][d] access used by templates, a date without posts reads
+    as an empty dict or list, like in a dict prefilled for every date'''
+
+    def __init__(self):
+        self.index = self.level()
+
+    def level(self, depth = 0):
+        '''Empty level of index at depth, years are at 0'''
+        if depth == 2:
+            return Level(list)
+        return Level(lambda: self.level(depth + 1))
+
+    def add(self, post):
+        date = post['date']
+        self.index.child(date.year).child(date.month).child(date.day).append(post)
+
+    def __getitem__(self, year):
+        return self.index[year]
+
+    def __contains__(self, year):
+        return year in self.index
+
+    def __iter__(self):
+        return iter(self.years())
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.years()
+
+    def years(self):
+        return sorted(self.index)
+
+    def months(self, year):
+        '''Months of year with posts, in order'''
+        return sorted(self.index.get(year, {}))
+
+    def days(self, year, month):
+        '''Days of month with posts, in order'''
+        return sorted(self.index.get(year, {}).get(month, {}))
+
+    def archives(self):
+        '''Yields (year, month, day, posts) for every day with posts, followed by
+        (year, month, None, posts) for its month, in date order'''
+        return archives(self.posts())
+
+    def posts(self):
+        '''Posts in date order, posts of a day in order they were added'''
+        for year in self.years():
+            for month in self.months(year):
+                for day in self.days(year, month):
+                    for post in self.index[year][month][day]:
+                        yield post
+
+
+class DateRuns(DateIndex):
+    '''Index of posts by date for builds which do not keep posts in memory. Posts are
+    appended to runs, extsort.SortedRuns in date order grouped by date, a day is an
+    extsort.Group read from runs when accessed'''
+
+    def __init__(self, runs):
+        DateIndex.__init__(self)
+        self.runs = runs
+
+    def add(self, post):
+        date = post['date']
+        days = self.index.child(date.year).child(date.month)
+        if not dict.__contains__(days, date.day):
+            days[date.day] = extsort.Group(self.runs, date.date())
+        self.runs.append(post)
+
+    def posts(self):
+        return iter(self.runs)
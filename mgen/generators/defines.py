@@ -21,3 +21,16 @@ inPages = 'pages'
 postTemplate = 'post.html'
 blogPageTemplate = 'page.html'
 indexTemplate = 'index.html'
+
+# Map of resources to their fingerprinted names, in output root
+resourcesManifest = 'resources.json'
+
+# Output files written with a gzip copy
+gzipExtensions = ['.html', '.rss', '.xml', '.txt']
+
+# Build cache folder, relative to source, and its content
+cache = '.mgen-cache'
+manifestFile = 'manifest.json'
+templatesCache = 'templates'
+markdownCache = 'markdown'
+postsCache = 'posts.pickle'
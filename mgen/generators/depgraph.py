@@ -0,0 +1,76 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import json
+import hashlib
+
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys = True, default = str)).hexdigest()
+
+def post_key(post):
+    postId = post['id']
+    if isinstance(postId, unicode):
+        postId = postId.encode('utf-8')
+    return '%s\0%s\0' % (postId, post['date'].isoformat())
+
+
+class DependencyGraph(object):
+    '''Posts every generated output is made of. An output key, its unicode path relative to target,
+    is mapped to (digest, ids): a digest of the parameters and of the ids & dates of its posts, in
+    order, and ids of the posts which content it shows. A post id is mapped to the hash of its file.
+    An output is generated again if its digest changed or if a post it shows changed, so an edit of
+    a post does not change digests and outputs which only list the post, like a site map, are kept'''
+
+    def __init__(self, outputs = None, posts = None):
+        self.outputs = {} if outputs is None else outputs
+        self.posts = {} if posts is None else posts
+        #{post id: [output]} of outputs showing a post, made by first dependents()
+        self.index = None
+
+    def add_post(self, post):
+        self.posts[post['id']] = post['hash']
+
+    def is_post_changed(self, postId, previous):
+        '''True if post is new or its file differs from the one in previous graph'''
+        return self.posts.get(postId) != previous.posts.get(postId)
+
+    def add_output(self, output, posts, params, content = True):
+        '''Record output made of posts & parameters, posts are only listed by output
+        unless it shows their content. Returns ids of posts which content output shows'''
+        sha = hashlib.sha1(params_hash(params))
+        ids = []
+        for post in posts:
+            sha.update(post_key(post))
+            if content:
+                ids.append(post['id'])
+        self.outputs[output] = (sha.hexdigest(), tuple(ids))
+        return ids
+
+    def keep_output(self, output, previous):
+        '''Output is made of the same posts & parameters as in previous graph.
+        Returns False if previous graph has no such output'''
+        entry = previous.outputs.get(output)
+        if entry is None:
+            return False
+        self.outputs[output] = entry
+        return True
+
+    def is_changed(self, output, previous):
+        '''True if posts or parameters of output differ from the ones in previous graph'''
+        return (self.outputs.get(output) or [None])[0] != (previous.outputs.get(output) or [None])[0]
+
+    def dependents(self, postIds):
+        '''Outputs showing any of posts. Outputs are indexed by post once, outputs added
+        later have to show the same posts'''
+        if self.index is None:
+            self.index = {}
+            for output, (digest, ids) in self.outputs.items():
+                for postId in ids:
+                    self.index.setdefault(postId, []).append(output)
+        outputs = set()
+        for postId in postIds:
+            outputs.update(self.index.get(postId, ()))
+        return outputs
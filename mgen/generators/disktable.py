@@ -0,0 +1,112 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import marshal
+import sqlite3
+import threading
+
+# Rows read from file at once by iteration
+batchSize = 1024
+
+
+def pack(value):
+    return sqlite3.Binary(marshal.dumps(value))
+
+def unpack(data):
+    return marshal.loads(str(data))
+
+def pack_key(key):
+    '''Packed key, ascii unicode is packed as str as they are the same key of a dict'''
+    if isinstance(key, unicode):
+        try:
+            key = key.encode('ascii')
+        except UnicodeEncodeError:
+            pass
+    return pack(key)
+
+
+class DiskTable(object):
+    '''Dict of str or unicode keys kept in an sqlite file at path instead of memory, for
+    tables with an entry per output of --low-memory builds. Keys and values are stored
+    with marshal and come back of the same types, except ascii unicode keys which come
+    back as str. Safe to use from several threads. Iteration lists keys there were when
+    it started'''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread = False)
+        #file is removed with the build, it is not worth a journal
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('PRAGMA journal_mode = OFF')
+        self.db.execute('CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, value BLOB)')
+
+    def __setitem__(self, key, value):
+        key, value = pack_key(key), pack(value)
+        with self.lock:
+            #updated in place, so a key keeps its place in iteration
+            if not self.db.execute('UPDATE entries SET value = ? WHERE key = ?', (value, key)).rowcount:
+                self.db.execute('INSERT INTO entries (key, value) VALUES (?, ?)', (key, value))
+
+    def get(self, key, default = None):
+        with self.lock:
+            row = self.db.execute('SELECT value FROM entries WHERE key = ?', (pack_key(key),)).fetchone()
+        if row is None:
+            return default
+        return unpack(row[0])
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __delitem__(self, key):
+        if self.pop(key, self) is self:
+            raise KeyError(key)
+
+    def pop(self, key, default = None):
+        with self.lock:
+            row = self.db.execute('SELECT value FROM entries WHERE key = ?', (pack_key(key),)).fetchone()
+            if row is None:
+                return default
+            self.db.execute('DELETE FROM entries WHERE key = ?', (pack_key(key),))
+        return unpack(row[0])
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def items(self):
+        '''(key, value) in order keys were added, read in batches'''
+        with self.lock:
+            end = self.db.execute('SELECT MAX(rowid) FROM entries').fetchone()[0] or 0
+        last = 0
+        while True:
+            with self.lock:
+                rows = self.db.execute('SELECT rowid, key, value FROM entries WHERE rowid > ? AND rowid <= ? ' +
+                    'ORDER BY rowid LIMIT ?', (last, end, batchSize)).fetchall()
+            if not rows:
+                return
+            for rowid, key, value in rows:
+                yield unpack(key), unpack(value)
+            last = rows[-1][0]
+
+    def __iter__(self):
+        return (key for key, value in self.items())
+
+    def keys(self):
+        return iter(self)
+
+    def update(self, items):
+        for key, value in items:
+            self[key] = value
+
+    def close(self):
+        with self.lock:
+            self.db.close()
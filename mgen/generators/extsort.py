@@ -0,0 +1,210 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import heapq
+import cPickle
+import tempfile
+import itertools
+
+import tagindex
+
+# Items sorted in memory before they are spilled to a run file
+runSize = 10000
+
+
+def read_run(path, offset = 0, count = None):
+    '''Records of a run file in order, count of them from offset if given'''
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        while count is None or count > 0:
+            try:
+                yield cPickle.load(handle)
+            except EOFError:
+                return
+            if count is not None:
+                count -= 1
+
+
+class SortedRuns(object):
+    '''Items sorted by key(item, number) with bounded memory, number is the order an item was
+    appended in. Items are buffered, sorted and spilled to run files in folder by runSize,
+    iteration merges the runs. Supports len() and slices of the sorted sequence.
+    With group(key), a function of a key prefix, items are counted by group and runs are
+    indexed by group, so items of a group are read from their places in runs only'''
+
+    def __init__(self, folder, key, size = None, group = None):
+        self.folder = folder
+        self.key = key
+        self.size = size or runSize
+        self.group = group
+        self.runs = []
+        self.buffer = []
+        self.count = 0
+        #items by group and (run, offset, count) of groups in runs
+        self.groups = {}
+        self.segments = {}
+
+    def append(self, item):
+        key = self.key(item, self.count)
+        self.buffer.append((key, item))
+        self.count += 1
+        if self.group:
+            group = self.group(key)
+            self.groups[group] = self.groups.get(group, 0) + 1
+        if len(self.buffer) >= self.size:
+            self.spill()
+
+    def spill(self):
+        self.buffer.sort(key = lambda record: record[0])
+        handle, path = tempfile.mkstemp(suffix = '.run', dir = self.folder)
+        with os.fdopen(handle, 'wb') as runFile:
+            if self.group:
+                for group, records in itertools.groupby(self.buffer, lambda record: self.group(record[0])):
+                    offset = runFile.tell()
+                    count = 0
+                    for record in records:
+                        cPickle.dump(record, runFile, cPickle.HIGHEST_PROTOCOL)
+                        count += 1
+                    self.segments.setdefault(group, []).append((path, offset, count))
+            else:
+                for record in self.buffer:
+                    cPickle.dump(record, runFile, cPickle.HIGHEST_PROTOCOL)
+        self.runs.append(path)
+        self.buffer = []
+
+    def records(self):
+        '''(key, item) in order of key'''
+        if not self.runs:
+            self.buffer.sort(key = lambda record: record[0])
+            return iter(self.buffer)
+        if self.buffer:
+            self.spill()
+        return heapq.merge(*[read_run(path) for path in self.runs])
+
+    def select(self, group):
+        '''Items of group in order of key, read from runs by their index'''
+        if self.buffer:
+            self.spill()
+        return [item for key, item in heapq.merge(*[read_run(*segment) for segment in self.segments.get(group, [])])]
+
+    def __iter__(self):
+        return (item for key, item in self.records())
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(itertools.islice(self, index.start, index.stop, index.step))
+        for item in itertools.islice(self, index, None):
+            return item
+        raise IndexError(index)
+
+    def close(self):
+        for path in self.runs:
+            os.remove(path)
+        self.runs = []
+        self.buffer = []
+        self.segments = {}
+
+
+class Group(object):
+    '''Sequence of items of a group of sorted runs, read from runs when accessed'''
+
+    def __init__(self, runs, group):
+        self.runs = runs
+        self.group = group
+
+    def __len__(self):
+        return self.runs.groups.get(self.group, 0)
+
+    def __iter__(self):
+        return iter(self.runs.select(self.group))
+
+    def __getitem__(self, index):
+        return self.runs.select(self.group)[index]
+
+
+class Pages(object):
+    '''Pages of perPage posts of a sorted sequence, numbered from 1. Like a dict of
+    page number to list of posts, with pages read from the sequence when accessed'''
+
+    def __init__(self, posts, perPage):
+        self.posts = posts
+        self.perPage = perPage
+
+    def __len__(self):
+        return tagindex.page_count(len(self.posts), self.perPage)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, number):
+        return 1 <= number <= len(self)
+
+    def __getitem__(self, number):
+        if not number in self:
+            raise KeyError(number)
+        return self.posts[(number - 1) * self.perPage:number * self.perPage]
+
+    def keys(self):
+        return range(1, len(self) + 1)
+
+    def items(self):
+        '''(number, posts) of every page, in one pass over the sequence'''
+        posts = iter(self.posts)
+        for number in self.keys():
+            yield number, list(itertools.islice(posts, self.perPage))
+
+
+class Tags(object):
+    '''Posts by tag, newest first, like tagindex.TagIndex. Posts are spilled to run files
+    in folder, only posts of one tag are in memory at once. Runs are indexed by tag,
+    posts of a tag are read from their places in runs'''
+
+    def __init__(self, folder):
+        self.runs = SortedRuns(folder, lambda record, number: (record[0], -record[1].sortKey, -number),
+            group = lambda key: key[0])
+        #posts per tag, keys are in the same order as of tag index
+        self.counts = self.runs.groups
+
+    def add(self, tag, post):
+        self.runs.append((tag, post))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __contains__(self, tag):
+        return tag in self.counts
+
+    def __getitem__(self, tag):
+        if not tag in self.counts:
+            raise KeyError(tag)
+        return [post for postTag, post in self.runs.select(tag)]
+
+    def count(self, tag):
+        return self.counts[tag]
+
+    def keys(self):
+        return self.counts.keys()
+
+    def items(self):
+        '''(tag, posts) of every tag, in order of tags'''
+        for tag, records in itertools.groupby(self.runs, lambda record: record[0]):
+            yield tag, [post for postTag, post in records]
+
+    def close(self):
+        self.runs.close()
+
+
+def spill_folder(parent):
+    '''New folder for run files in parent folder'''
+    if not os.path.exists(parent):
+        os.makedirs(parent)
+    return tempfile.mkdtemp(prefix = 'runs-', dir = parent)
@@ -4,6 +4,7 @@
 #
 
 import os
+import re
 import sys
 import random
 import datetime
@@ -21,12 +22,45 @@ import BeautifulSoup
 
 from mako import exceptions
 from mako.template import Template
+from mako.runtime import capture
 from texthlp import cut
 from xml.dom.minidom import parseString as parseXmlString
 
 #website root path setup by MrHide.__init__()
 webroot = '/'
 
+#fingerprinted path by resource path setup by MrHide.generate()
+resourceMap = {}
+
+#folder of rendered markdown cache setup by MrHide.__init__()
+markdownCacheFolder = None
+
+#rendered markdown by source hash, cleared when full
+markdownCache = {}
+markdownCacheSize = 4096
+
+#templates compiled by render() from content with mako markup, kept by the process,
+#cleared when full. Content without markup is not compiled, so only posts written as
+#templates take room and a few hundred of them is plenty
+renderTemplates = {}
+renderTemplatesSize = 256
+
+#mako markup: expressions, tags, control & comment lines and line continuations
+makoMarkup = re.compile(r'\$\{|</?%|^[ \t]*(%|##)|\\$', re.M)
+
+#markdown converter reused by every conversion of this process
+markdownConverter = None
+
+#extensions of markdown converter, cached html is keyed by them and by markdown version
+markdownExtensions = []
+
+#rendered template fragments of current build, cleared by MrHide.generate()
+fragmentCache = {}
+fragmentCacheSize = 16384
+
+#size of caches with --low-memory, rendered markdown is read from its cache folder instead
+lowMemoryCacheSize = 256
+
 MonthNames = {
 	1 : 'January',
 	2 : 'February',
@@ -77,13 +111,21 @@ def link(linkPath):
 def resource(resourcePath):
 	if resourcePath.startswith('/'):
 		resourcePath = resourcePath[1:]
+	resourcePath = resourceMap.get(resourcePath, resourcePath)
 	return os.path.join(webroot, defines.resources, resourcePath)
 
 def format_timestamp(timestamp):
 	return 'on %s ' % timestamp.strftime("%A, %d. %B %Y")
 
 def render(content, *args, **kwargs):
-  tmpl = Template(content)
+  if not makoMarkup.search(content):
+    #rendered as it is
+    return content
+  tmpl = renderTemplates.get(content)
+  if tmpl is None:
+    if len(renderTemplates) >= renderTemplatesSize:
+      renderTemplates.clear()
+    tmpl = renderTemplates[content] = Template(content)
   try:
     return tmpl.render(
       encoding = 'utf-8',
@@ -95,6 +137,90 @@ def render(content, *args, **kwargs):
     return exceptions.text_error_template().render()
 
 
+def limit_caches():
+	'''Keep a few entries in memory caches of rendered markdown & fragments, for --low-memory'''
+	global markdownCacheSize
+	global fragmentCacheSize
+	markdownCacheSize = fragmentCacheSize = lowMemoryCacheSize
+	markdownCache.clear()
+	fragmentCache.clear()
+
+def markdown_html(source):
+	'''Convert markdown source to html, memoized by source hash in memory and on disk'''
+	global markdownConverter
+	sha = hashlib.sha1('%s\0%s\0' % (markdown.version, ','.join(markdownExtensions)))
+	sha.update(source.encode('utf-8'))
+	key = sha.hexdigest()
+	if key in markdownCache:
+		return markdownCache[key]
+	
+	cachePath = None
+	html = None
+	if markdownCacheFolder:
+		cachePath = os.path.join(markdownCacheFolder, key[:2], key + '.html')
+		if os.path.exists(cachePath):
+			with open(cachePath, 'rb') as cacheFile:
+				html = cacheFile.read().decode('utf-8')
+			#mtime tells the entry is used, see prune_markdown_cache()
+			os.utime(cachePath, None)
+	
+	if html is None:
+		if markdownConverter is None:
+			markdownConverter = markdown.Markdown(extensions = markdownExtensions)
+		html = markdownConverter.reset().convert(source)
+		if cachePath:
+			if not os.path.exists(os.path.dirname(cachePath)):
+				try:
+					os.makedirs(os.path.dirname(cachePath))
+				except OSError:
+					#created by another worker
+					pass
+			with open(cachePath + '.%d' % os.getpid(), 'wb') as cacheFile:
+				cacheFile.write(html.encode('utf-8'))
+			os.rename(cachePath + '.%d' % os.getpid(), cachePath)
+	
+	if len(markdownCache) >= markdownCacheSize:
+		markdownCache.clear()
+	markdownCache[key] = html
+	return html
+
+def prune_markdown_cache(before):
+	'''Remove cached html not used since before, a timestamp. Returns number of removed entries'''
+	removed = 0
+	if not markdownCacheFolder or not os.path.exists(markdownCacheFolder):
+		return removed
+	for root, dirs, files in os.walk(markdownCacheFolder):
+		for name in files:
+			path = os.path.join(root, name)
+			try:
+				if os.path.getmtime(path) < before:
+					os.remove(path)
+					removed += 1
+			except OSError:
+				pass
+	return removed
+
 def text(post, join_with = '\n', *args, **kwargs):
-	md_content = markdown.markdown(join_with.join(post['text']))
-	return render(md_content, *args, **kwargs)
\ No newline at end of file
+	md_content = markdown_html(join_with.join(post['text']))
+	return render(md_content, *args, **kwargs)
+
+def fragment_key(value):
+	'''A post is keyed by its content hash, other values by themselves'''
+	if getattr(value, 'hash', None):
+		return ('post', value.hash)
+	return value
+
+def cached_fragment(context, key, fn, *args, **kwargs):
+	'''Render template def fn once per build for a key & arguments and reuse the result, e.g.
+	  ${helpers.cached_fragment(context, post, summary, post)}
+	fn is keyed by its compiled template module, arguments other than posts have to be hashable'''
+	cacheKey = (fn.func_code.co_filename, fn.__name__, fragment_key(key),
+		tuple([fragment_key(arg) for arg in args]),
+		tuple(sorted([(name, fragment_key(value)) for name, value in kwargs.items()])))
+	if cacheKey in fragmentCache:
+		return fragmentCache[cacheKey]
+	fragment = capture(context, fn, *args, **kwargs)
+	if len(fragmentCache) >= fragmentCacheSize:
+		fragmentCache.clear()
+	fragmentCache[cacheKey] = fragment
+	return fragment
@@ -0,0 +1,139 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import json
+import hashlib
+import logging
+
+import depgraph
+
+# Format of manifest file, only outputs are read from a manifest of other format
+version = 3
+
+# Options which do not affect generated content and are not hashed
+volatileOptions = ['debug', 'clear', 'full', 'cache', 'jobs', 'hardlinks', 'gzip', 'gzip_min_size',
+    'watch', 'watch_interval', 'profile', 'profile_stats', 'low_memory', 'tar']
+
+
+def path_key(path):
+    '''Manifest keys are unicode, as they come back from json'''
+    if isinstance(path, str):
+        return path.decode('utf-8', 'replace')
+    return path
+
+def hash_data(data):
+    return hashlib.sha1(data).hexdigest()
+
+def hash_file(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(65536), ''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def hash_tree(folder):
+    '''Returns {relative path: hash} for every file in folder'''
+    hashes = {}
+    if not os.path.exists(folder):
+        return hashes
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            hashes[path_key(os.path.relpath(path, folder))] = hash_file(path)
+    return hashes
+
+def update_hashes(hashes, folder, paths):
+    '''Copy of {relative path: hash} of hash_tree(folder) with changed paths hashed again'''
+    hashes = dict(hashes)
+    for path in paths:
+        key = path_key(os.path.relpath(path, folder))
+        if os.path.isfile(path):
+            hashes[key] = hash_file(path)
+        else:
+            hashes.pop(key, None)
+    return hashes
+
+def hash_options(options):
+    values = dict([(k, v) for k, v in vars(options).items() if not k in volatileOptions])
+    return hash_data(json.dumps(values, sort_keys = True, default = str))
+
+
+class Manifest(object):
+    '''Hashes of the inputs of a build and [size, hash] of its outputs, persisted between builds.
+    Outputs and their dependency graph are kept in tables made by table(), dicts by default.
+    Manifest file is a json header followed by a json line per post of the graph and a json
+    line per output, so it is read and written one post or output at a time'''
+
+    def __init__(self, path, table = dict):
+        self.path = path
+        self.table = table
+        self.options = None
+        self.templates = {}
+        self.pages = {}
+        self.resources = {}
+        self.outputs = table()
+        self.graph = depgraph.DependencyGraph(table(), table())
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r') as handle:
+                header = json.loads(handle.readline())
+                if header.get('version') != version:
+                    #earlier manifest is a single json object or a json line per output,
+                    #its outputs are removed if not generated again
+                    outputs = header.get('outputs', {})
+                    if isinstance(outputs, list):
+                        #outputs without sizes & hashes
+                        outputs = dict.fromkeys(outputs)
+                    self.outputs.update(outputs.items())
+                    for line in handle:
+                        output, info = json.loads(line)[:2]
+                        self.outputs[output] = info
+                    return False
+                for number in xrange(header.get('posts', 0)):
+                    postId, sha = json.loads(handle.readline())
+                    self.graph.posts[postId] = sha
+                for line in handle:
+                    output, info, entry = json.loads(line)
+                    self.outputs[output] = info
+                    if entry:
+                        self.graph.outputs[output] = (entry[0], tuple(entry[1]))
+        except ValueError:
+            logging.warning('Ignoring broken manifest %s' % self.path)
+            self.outputs = self.table()
+            self.graph = depgraph.DependencyGraph(self.table(), self.table())
+            return False
+        self.options = header.get('options')
+        self.templates = header.get('templates', {})
+        self.pages = header.get('pages', {})
+        self.resources = header.get('resources', {})
+        return True
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        #write a temporary file first, an interrupted build keeps the old manifest
+        tmpPath = self.path + '.tmp'
+        with open(tmpPath, 'w') as handle:
+            json.dump({
+                'version': version,
+                'options': self.options,
+                'templates': self.templates,
+                'pages': self.pages,
+                'resources': self.resources,
+                'posts': len(self.graph.posts)
+            }, handle)
+            handle.write('\n')
+            for postId, sha in self.graph.posts.items():
+                json.dump([postId, sha], handle)
+                handle.write('\n')
+            for output, info in self.outputs.items():
+                json.dump([output, info, self.graph.outputs.get(output)], handle)
+                handle.write('\n')
+        os.rename(tmpPath, self.path)
@@ -0,0 +1,226 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import sys
+import hashlib
+import gzip
+import logging
+import threading
+import Queue
+import StringIO
+
+import manifest
+
+# Size of queues between parse, render and write stages
+queueSize = 64
+
+# Number of threads writing output files
+writeThreads = 4
+
+
+def gzip_data(content):
+    '''Gzip compressed content, same content gives the same data'''
+    data = StringIO.StringIO()
+    #no name & time in gzip header
+    gzipFile = gzip.GzipFile('', 'wb', 9, data, 0)
+    gzipFile.write(content)
+    gzipFile.close()
+    return data.getvalue()
+
+
+def parse_stage(parse, paths):
+    '''Parse paths in a thread, yields parsed items from a bounded queue.
+    Thread stops when the generator is closed before all paths are parsed'''
+    queue = Queue.Queue(queueSize)
+    stopped = threading.Event()
+    def run():
+        try:
+            for path in paths:
+                if stopped.is_set():
+                    return
+                queue.put((parse(path), None))
+        except BaseException:
+            #sys.exit() of parser is raised again in the generator thread
+            queue.put((None, sys.exc_info()))
+        queue.put((None, None))
+    thread = threading.Thread(target = run, name = 'parse')
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = queue.get()
+            if error:
+                raise error[0], error[1], error[2]
+            if item is None:
+                return
+            yield item
+    finally:
+        stopped.set()
+        #thread may wait for room in the queue
+        while thread.is_alive():
+            try:
+                queue.get(timeout = 0.1)
+            except Queue.Empty:
+                pass
+
+
+class OutputStream(object):
+    '''Output file written in parts. Parts go to a handle of the backend which writes
+    the file on close, unless the file has the same content already. Path may be
+    changed until the stream is closed'''
+
+    def __init__(self, writer, path):
+        self.writer = writer
+        self.path = path
+        self.handle = writer.backend.create(path)
+        self.sha = hashlib.sha1()
+        self.size = 0
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode('utf-8', 'replace')
+        self.handle.write(data)
+        self.sha.update(data)
+        self.size += len(data)
+
+    def close(self):
+        changed = self.writer.backend.commit(self.path, self.handle)
+        self.writer.record(self.path, (self.size, self.sha.hexdigest()), changed)
+
+
+class Writer(object):
+    '''Write stage: output files are queued to a bounded queue and written to backend by a pool of threads.
+    Writer keeps (size, hash) of every file of the build by path in files, a dict unless given,
+    and counts changed, unchanged, kept & removed files and bytes written'''
+
+    def __init__(self, backend, threads = writeThreads, hardlink = False, files = None):
+        self.backend = backend
+        self.hardlink = hardlink
+        self.queue = Queue.Queue(queueSize)
+        self.error = None
+        self.files = {} if files is None else files
+        self.lock = threading.Lock()
+        self.changed = 0
+        self.unchanged = 0
+        self.kept = 0
+        self.removed = 0
+        self.written = 0
+        self.threads = []
+        for index in range(threads):
+            thread = threading.Thread(target = self.run, name = 'writer-%d' % index)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                if not self.error:
+                    self.process(*job)
+            except:
+                logging.debug('Failed to write %s' % job[1])
+                self.error = sys.exc_info()
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        if self.error:
+            error, self.error = self.error, None
+            raise error[0], error[1], error[2]
+
+    def process(self, path, content, copies):
+        changes = []
+        if content is not None:
+            changes.append(self.backend.write(path, content))
+            info = (len(content), manifest.hash_data(content))
+        else:
+            info = self.info(path)
+        for copy in copies:
+            changes.append(self.backend.copy(path, copy, self.hardlink))
+        with self.lock:
+            self.files[path] = info
+            for copy in copies:
+                self.files[copy] = info
+            self.changed += changes.count(True)
+            self.unchanged += changes.count(False)
+            self.written += info[0] * changes.count(True)
+
+    def info(self, path):
+        '''(size, hash) of a file of the build, or of a file in backend'''
+        with self.lock:
+            info = self.files.get(path)
+        if info:
+            return info
+        return self.backend.info(path)
+
+    def write(self, path, content, copies = []):
+        '''Queue content to be written to path and copied to each of copies.
+        Blocks while the queue is full'''
+        self.check()
+        with self.lock:
+            self.files[path] = None
+            for copy in copies:
+                self.files[copy] = None
+        self.queue.put((path, content, copies))
+
+    def copy(self, path, copy):
+        '''Queue copy, or hardlink, of a written file'''
+        self.check()
+        with self.lock:
+            self.files[copy] = None
+        self.queue.put((path, None, [copy]))
+
+    def open(self, path):
+        '''Stream to write file at path in parts, written when stream is closed'''
+        self.check()
+        return OutputStream(self, path)
+
+    def record(self, path, info, changed):
+        '''File written by a stream'''
+        with self.lock:
+            self.files[path] = info
+            if changed:
+                self.changed += 1
+                self.written += info[0]
+            else:
+                self.unchanged += 1
+
+    def keep(self, path, info = None):
+        '''Existing file is a file of this build, info is its (size, hash) if known'''
+        if not info:
+            info = self.backend.info(path)
+        with self.lock:
+            self.files[path] = tuple(info)
+            self.kept += 1
+
+    def remove(self, path):
+        '''Remove file which is not a part of the build'''
+        if self.backend.remove(path):
+            self.removed += 1
+
+    def join(self):
+        '''Wait for all queued files to be written'''
+        self.queue.join()
+        self.check()
+
+    def close(self):
+        '''Wait for queued files, stop threads and close backend'''
+        self.join()
+        self.stop()
+
+    def stop(self):
+        '''Stop threads once queued files are processed and close backend, errors are not raised.
+        Does nothing if writer is stopped already'''
+        if not self.threads:
+            return
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.backend.close()
@@ -0,0 +1,67 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import logging
+import cPickle
+
+# Format of cached posts, cache of other format is ignored
+version = 2
+
+
+class PostCache(object):
+    '''Parsed posts kept between builds, keyed by post file path, mtime & size.
+    Cache made with other options is ignored, as they affect parsing'''
+
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+        self.posts = {}
+        self.used = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'rb') as handle:
+                cacheVersion, options, posts = cPickle.load(handle)
+        except Exception, e:
+            logging.warning('Ignoring broken post cache %s: %s' % (self.path, e))
+            return False
+        if cacheVersion != version or options != self.options:
+            return False
+        self.posts = posts
+        return True
+
+    def get(self, filename, parse, check = True):
+        '''Cached post of the file, or parse(filename) if file was changed.
+        Without check a cached post is used as it is, file is not looked at'''
+        cached = self.posts.get(filename)
+        if cached and not check:
+            self.used[filename] = cached
+            return cached[1]
+        stat = os.stat(filename)
+        key = (stat.st_mtime, stat.st_size)
+        if cached and cached[0] == key:
+            post = cached[1]
+        else:
+            post = parse(filename)
+        self.used[filename] = (key, post)
+        return post
+
+    def reuse(self):
+        '''Start next build of the same process with posts of this one'''
+        self.posts.update(self.used)
+        self.used = {}
+
+    def save(self):
+        '''Save posts used by this build, removed posts are dropped'''
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmpPath = self.path + '.tmp'
+        with open(tmpPath, 'wb') as handle:
+            cPickle.dump((version, self.options, self.used), handle, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmpPath, self.path)
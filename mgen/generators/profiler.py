@@ -0,0 +1,87 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import time
+import json
+import cProfile
+
+
+def cpu_time():
+    '''User & system time of this process and of its ended child processes'''
+    times = os.times()
+    return times[0] + times[1] + times[2] + times[3]
+
+
+class Profiler(object):
+    '''Wall & cpu time of build phases, render time of templates & outputs.
+    A phase lasts until the next one starts. Cpu time of rendering workers is counted
+    when they end, in the phase the pool is joined in, render with --jobs. With stats every phase runs under
+    cProfile and stats of the slowest phase are kept. Does nothing if disabled'''
+
+    def __init__(self, enabled = False, stats = False):
+        self.enabled = enabled
+        self.stats = stats
+        self.phases = []
+        self.templates = {}
+        self.outputs = {}
+        self.current = None
+        self.slowest = None
+
+    def phase(self, name):
+        '''Start phase name, ends current phase'''
+        if not self.enabled:
+            return
+        self.stop()
+        self.current = [name, time.time(), cpu_time(), None]
+        if self.stats:
+            self.current[3] = cProfile.Profile()
+            self.current[3].enable()
+
+    def stop(self):
+        '''End current phase'''
+        if not self.current:
+            return
+        name, wall, cpu, profile = self.current
+        wall = time.time() - wall
+        cpu = cpu_time() - cpu
+        if profile:
+            profile.disable()
+            if not self.slowest or self.slowest[1] < wall:
+                self.slowest = (name, wall, profile)
+        self.phases.append({'name': name, 'wall': wall, 'cpu': cpu})
+        self.current = None
+
+    def template(self, name, seconds):
+        if not self.enabled:
+            return
+        count, total = self.templates.get(name, (0, 0.0))
+        self.templates[name] = (count + 1, total + seconds)
+
+    def output(self, key, seconds):
+        if self.enabled:
+            self.outputs[key] = seconds
+
+    def save(self, path, files):
+        '''Write JSON report to path, files are counts of written files.
+        Stats of the slowest phase go to the path with .prof extension'''
+        self.stop()
+        report = {
+            'total': {
+                'wall': sum([phase['wall'] for phase in self.phases]),
+                'cpu': sum([phase['cpu'] for phase in self.phases])
+            },
+            'phases': self.phases,
+            'templates': dict([(name, {'count': count, 'wall': total})
+                for name, (count, total) in self.templates.items()]),
+            'outputs': self.outputs,
+            'files': files
+        }
+        if self.slowest:
+            statsPath = os.path.splitext(path)[0] + '.prof'
+            self.slowest[2].dump_stats(statsPath)
+            report['stats'] = {'phase': self.slowest[0], 'path': statsPath}
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent = 1, sort_keys = True)
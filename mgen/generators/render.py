@@ -0,0 +1,153 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import time
+import hashlib
+import functools
+
+from mako.template import Template
+from mako.lookup import TemplateLookup
+from mako import exceptions
+
+import helpers
+import defines
+
+# Template lookup & options of a rendering worker process
+workerTemplates = None
+workerOptions = None
+
+# Inline templates compiled by this process, by cache folder & source hash
+inlineTemplates = {}
+
+# Readable names of inline templates, by uri
+inlineNames = {}
+
+# Jobs sent to a worker at once
+chunkSize = 8
+
+
+def source_hash(*sources):
+    sha = hashlib.sha1()
+    for source in sources:
+        if isinstance(source, unicode):
+            source = source.encode('utf-8')
+        sha.update(source)
+    return sha.hexdigest()
+
+def touch(*paths):
+    '''mtime of a cached file tells it is used, see prune_templates()'''
+    for path in paths:
+        if os.path.exists(path):
+            os.utime(path, None)
+
+def module_filename(folder, filename, uri):
+    '''Compiled module path of a template file, keyed by hash of its uri & source'''
+    with open(filename, 'rb') as templateFile:
+        path = os.path.join(folder, '%s.py' % source_hash(uri, templateFile.read()))
+    touch(path)
+    return path
+
+def template_lookup(options):
+    '''Lookup of site templates, compiled modules are kept in build cache'''
+    return TemplateLookup(directories=[ os.path.join(options.source, defines.inTemplates) ],
+                          modulename_callable=functools.partial(module_filename,
+                            os.path.join(options.cache, defines.templatesCache)),
+                          output_encoding='utf-8',
+                          encoding_errors='replace')
+
+def inline_template(source, options, lookup = None, name = None):
+    '''Template from source, compiled once per process and lookup. Source and compiled
+    module are kept in build cache under the source hash, name tells where source comes from'''
+    key = source_hash(source)
+    folder = os.path.join(options.cache, defines.templatesCache)
+    sourcePath = os.path.join(folder, '%s.mako' % key)
+    if name:
+        inlineNames[os.path.basename(sourcePath)] = name
+    touch(sourcePath, os.path.join(folder, '%s.py' % key))
+    template = inlineTemplates.get((folder, key))
+    if template is not None and template.lookup is lookup:
+        return template
+    if not os.path.exists(sourcePath):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(sourcePath + '.tmp', 'wb') as sourceFile:
+            sourceFile.write(source.encode('utf-8') if isinstance(source, unicode) else source)
+        os.rename(sourcePath + '.tmp', sourcePath)
+    template = Template(filename = sourcePath,
+                        uri = os.path.basename(sourcePath),
+                        module_filename = os.path.join(folder, '%s.py' % key),
+                        lookup = lookup)
+    inlineTemplates[(folder, key)] = template
+    return template
+
+def template_name(template):
+    '''Name of a site template or name given to an inline template'''
+    return inlineNames.get(template.uri, template.uri)
+
+def remove_inline_template(key, options):
+    '''Remove inline template of source hash key from build cache'''
+    folder = os.path.join(options.cache, defines.templatesCache)
+    inlineTemplates.pop((folder, key), None)
+    inlineNames.pop('%s.mako' % key, None)
+    for path in [os.path.join(folder, '%s.mako' % key), os.path.join(folder, '%s.py' % key)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+def prune_templates(options, before):
+    '''Remove compiled templates & inline template sources not used since before, a timestamp.
+    Returns number of removed files'''
+    removed = 0
+    folder = os.path.join(options.cache, defines.templatesCache)
+    if not os.path.exists(folder):
+        return removed
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < before:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    for key, template in inlineTemplates.items():
+        if key[0] == folder and not os.path.exists(template.filename):
+            del inlineTemplates[key]
+    return removed
+
+def render(template, options, *args, **kwargs):
+    return template.render(
+        encoding = 'utf-8',
+        helpers = helpers,
+        options = options,
+        *args,
+        **kwargs
+    )
+
+def init_worker(options, resourceMap):
+    '''Pool initializer, each worker keeps its own warm template lookup'''
+    global workerTemplates
+    global workerOptions
+    helpers.webroot = options.webroot
+    helpers.resourceMap = resourceMap
+    helpers.markdownCacheFolder = os.path.join(options.cache, defines.markdownCache)
+    if options.low_memory:
+        helpers.limit_caches()
+    workerTemplates = template_lookup(options)
+    workerOptions = options
+
+def render_job(job):
+    '''Render (path, template file, copies, kwargs) job in a worker. Returns
+    (path, copies, content, error, template file, seconds) back to the generator'''
+    path, templateFile, copies, kwargs = job
+    started = time.time()
+    try:
+        content = render(workerTemplates.get_template(templateFile), workerOptions, **kwargs)
+    except:
+        return path, copies, None, exceptions.text_error_template().render(), templateFile, 0
+    return path, copies, content, None, templateFile, time.time() - started
+
+def render_jobs(jobs):
+    '''Render a chunk of jobs in a worker, results are in order of jobs'''
+    return [render_job(job) for job in jobs]
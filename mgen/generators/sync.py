@@ -0,0 +1,103 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import logging
+from multiprocessing.pool import ThreadPool
+
+import manifest
+import pipeline
+
+
+def is_synced(source, target):
+    '''True if target file is the same as source: same size and mtime,
+    or same size and hash'''
+    if not os.path.isfile(target):
+        return False
+    sourceStat = os.stat(source)
+    targetStat = os.stat(target)
+    if sourceStat.st_size != targetStat.st_size:
+        return False
+    if int(sourceStat.st_mtime) == int(targetStat.st_mtime):
+        return True
+    if manifest.hash_file(source) == manifest.hash_file(target):
+        #same content, next time mtime is enough
+        shutil.copystat(source, target)
+        return True
+    return False
+
+def sync_file(paths):
+    '''Copy source to target unless it is synced already. Returns True if copied'''
+    source, target = paths
+    if is_synced(source, target):
+        return False
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    shutil.copy2(source, target)
+    return True
+
+def fingerprint_name(path, sha):
+    '''Path with hash in file name, i.e. css/site.0123456789ab.css'''
+    root, ext = os.path.splitext(path)
+    return '%s.%s%s' % (root, sha[:12], ext)
+
+def sync_tree(source, target, aliases = {}, threads = pipeline.writeThreads):
+    '''Make target folder a copy of source folder, like "rsync -a --delete source/ target".
+    aliases maps relative path of a source file to one more relative path of its copy.
+    Changed files are copied by a pool of threads, files not in source are removed.
+    Returns (copied, unchanged, removed) counts'''
+    copies = []
+    for root, dirs, files in os.walk(source):
+        targetRoot = os.path.join(target, os.path.relpath(root, source))
+        if not os.path.isdir(targetRoot):
+            if os.path.exists(targetRoot):
+                os.remove(targetRoot)
+            os.makedirs(targetRoot)
+        for name in files:
+            copies.append((os.path.join(root, name), os.path.join(targetRoot, name)))
+            alias = aliases.get(manifest.path_key(os.path.relpath(copies[-1][0], source)))
+            if alias:
+                copies.append((copies[-1][0], os.path.join(target, alias.encode('utf-8'))))
+    expected = set([os.path.normpath(copy) for path, copy in copies])
+
+    pool = ThreadPool(threads)
+    try:
+        copied = pool.map(sync_file, copies).count(True)
+    finally:
+        pool.close()
+        pool.join()
+
+    #remove stale files & folders, deepest first
+    removed = 0
+    for root, dirs, files in os.walk(target, topdown = False):
+        sourceRoot = os.path.join(source, os.path.relpath(root, target))
+        for name in files:
+            if not os.path.normpath(os.path.join(root, name)) in expected:
+                logging.debug('Removing %s' % os.path.join(root, name))
+                os.remove(os.path.join(root, name))
+                removed += 1
+        if not os.path.isdir(sourceRoot) and not os.listdir(root):
+            os.rmdir(root)
+    return copied, len(copies) - copied, removed
+
+def copy_tree(writer, source, target, aliases = {}):
+    '''Write every file of source folder to target folder with writer, for backends
+    which do not keep files of previous build. aliases are as of sync_tree.
+    Returns number of files written'''
+    count = 0
+    for root, dirs, files in os.walk(source):
+        targetRoot = os.path.join(target, os.path.relpath(root, source))
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as handle:
+                content = handle.read()
+            copies = []
+            alias = aliases.get(manifest.path_key(os.path.relpath(path, source)))
+            if alias:
+                copies.append(os.path.join(target, alias.encode('utf-8')))
+            writer.write(os.path.normpath(os.path.join(targetRoot, name)), content, copies)
+            count += 1 + len(copies)
+    return count
@@ -0,0 +1,64 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+
+def page_count(count, perPage):
+    '''Number of pages of perPage items for count items, last page may be shorter'''
+    return (count + perPage - 1) / perPage
+
+def paginate(posts, perPage):
+    '''Yields (number, total, posts) of every page of posts, numbered from 1'''
+    total = page_count(len(posts), perPage)
+    for number in range(1, total + 1):
+        yield number, total, posts[(number - 1) * perPage:number * perPage]
+
+
+class TagIndex(object):
+    '''Posts by tag, newest first. Posts of a tag are sorted once, when the index is
+    read after all posts were added. Supports dict access used by templates'''
+
+    def __init__(self):
+        self.index = {}
+        self.sorted = True
+
+    def add(self, tag, post):
+        if tag in self.index:
+            self.index[tag].append(post)
+        else:
+            self.index[tag] = [post]
+        self.sorted = False
+
+    def sort(self):
+        if self.sorted:
+            return
+        for posts in self.index.values():
+            #newest first, posts of the same time in reverse order they were added
+            posts.sort(key = lambda post: post.sortKey)
+            posts.reverse()
+        self.sorted = True
+
+    def __getitem__(self, tag):
+        self.sort()
+        return self.index[tag]
+
+    def count(self, tag):
+        '''Number of posts with tag'''
+        return len(self.index[tag])
+
+    def __contains__(self, tag):
+        return tag in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        self.sort()
+        return self.index.items()
@@ -0,0 +1,7 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+# Generator tests:
+#   python -m unittest discover -s mgen/generators/tests -t .
+#
@@ -0,0 +1,131 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import shutil
+import tarfile
+import tempfile
+import unittest
+import StringIO
+import subprocess
+
+from mgen.generators import backends
+from mgen.generators import manifest
+
+# Builds a small site with options of bench.build and tar archive '-', run in a process of its own
+tarStdoutScript = '''
+import sys
+from mgen.generators import MGEN
+from mgen.generators.bench import build, corpus
+corpus.make_site(sys.argv[1], posts = 5, tags = 3)
+#status output goes to stderr like in mgen.cmd, stdout is taken by the archive
+sys.stdout = sys.stderr
+MGEN(build.build_options(sys.argv[1], sys.argv[2], years = [2012, 2013], tar = '-')).generate()
+'''
+
+
+class FileBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, True)
+
+    def test_write_changed_only(self):
+        backend = backends.FileBackend(self.root)
+        path = os.path.join(self.root, 'a', 'b', 'index.html')
+        backend.makedirs(os.path.dirname(path))
+        self.assertTrue(backend.write(path, 'content'))
+        self.assertFalse(backend.write(path, 'content'))
+        self.assertTrue(backend.write(path, 'other'))
+        self.assertEqual(backend.read(path), 'other')
+        self.assertEqual(backend.info(path), (5, manifest.hash_data('other')))
+
+    def test_commit(self):
+        backend = backends.FileBackend(self.root)
+        path = os.path.join(self.root, 'feed.rss')
+        for changed in [True, False]:
+            handle = backend.create(path)
+            handle.write('feed')
+            self.assertEqual(backend.commit(path, handle), changed)
+        self.assertEqual(os.listdir(self.root), ['feed.rss'])
+
+    def test_remove_empty_folders(self):
+        backend = backends.FileBackend(self.root)
+        path = os.path.join(self.root, 'a', 'b', 'index.html')
+        backend.create_folders([os.path.dirname(path)])
+        backend.write(path, 'content')
+        self.assertTrue(backend.remove(path))
+        self.assertFalse(backend.remove(path))
+        self.assertEqual(os.listdir(self.root), [])
+        #folders are made again once removed
+        backend.makedirs(os.path.dirname(path))
+        self.assertTrue(os.path.isdir(os.path.dirname(path)))
+
+    def test_cache_size(self):
+        backend = backends.FileBackend(self.root, cacheSize = 2)
+        folders = [os.path.join(self.root, 'a', str(index)) for index in range(5)]
+        backend.create_folders(folders)
+        self.assertTrue(all([os.path.isdir(folder) for folder in folders]))
+        self.assertTrue(len(backend.folders) <= 2)
+        self.assertEqual(backend.listings, {})
+
+
+class MemoryBackendTest(unittest.TestCase):
+
+    def test_files(self):
+        backend = backends.MemoryBackend('/site')
+        self.assertTrue(backend.write('/site/a/index.html', 'content'))
+        self.assertFalse(backend.write('/site/a/index.html', 'content'))
+        backend.copy('/site/a/index.html', '/site/b/index.html')
+        self.assertEqual(backend.read('/site/b/index.html'), 'content')
+        self.assertTrue(backend.isdir('/site/b'))
+        self.assertTrue(backend.remove('/site/a/index.html'))
+        self.assertFalse(backend.exists('/site/a/index.html'))
+        self.assertRaises(IOError, backend.read, '/site/a/index.html')
+
+
+class TarBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def test_archive(self):
+        path = os.path.join(self.folder, 'site.tar')
+        backend = backends.TarBackend('/site', path)
+        backend.write('/site/a/index.html', 'content')
+        backend.copy('/site/a/index.html', '/site/b/index.html')
+        handle = backend.create('/site/feed.rss')
+        handle.write('feed')
+        backend.commit('/site/feed.rss', handle)
+        self.assertTrue(backend.exists('/site/a'))
+        self.assertRaises(IOError, backend.read, '/site/a/index.html')
+        backend.close()
+        with tarfile.open(path) as archive:
+            self.assertEqual(archive.getnames(), ['a/index.html', 'b/index.html', 'feed.rss'])
+            self.assertTrue(archive.getmember('b/index.html').islnk())
+            self.assertEqual(archive.extractfile('feed.rss').read(), 'feed')
+
+    def test_stdout(self):
+        '''Archive streamed to stdout is not mixed with status output of the build'''
+        process = subprocess.Popen([sys.executable, '-c', tarStdoutScript, os.path.join(self.folder, 'site'),
+            os.path.join(self.folder, 'out')], stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+        output, errors = process.communicate()
+        self.assertEqual(process.returncode, 0, errors)
+        self.assertTrue('Done.' in errors)
+        with tarfile.open(fileobj = StringIO.StringIO(output)) as archive:
+            names = archive.getnames()
+        self.assertTrue('index.html' in names)
+        self.assertTrue('sitemap.xml' in names)
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'out')))
+
+
+if __name__ == '__main__':
+    unittest.main()
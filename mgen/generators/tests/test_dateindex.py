@@ -0,0 +1,51 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import datetime
+import unittest
+
+from mgen.generators import dateindex
+
+
+class DatedPost(dict):
+
+    def __init__(self, name, *date):
+        dict.__init__(self, name = name, date = datetime.datetime(*date))
+
+
+class DateIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.posts = [DatedPost('b', 2012, 3, 4), DatedPost('a', 2011, 12, 31), DatedPost('c', 2012, 3, 4),
+            DatedPost('d', 2012, 1, 2)]
+        self.dates = dateindex.DateIndex()
+        for post in self.posts:
+            self.dates.add(post)
+
+    def test_sparse(self):
+        self.assertEqual(self.dates.years(), [2011, 2012])
+        self.assertEqual(self.dates.months(2012), [1, 3])
+        self.assertEqual(self.dates.days(2012, 3), [4])
+        self.assertEqual([post['name'] for post in self.dates[2012][3][4]], ['b', 'c'])
+
+    def test_dates_without_posts(self):
+        #templates read every date like in an index filled for every day
+        self.assertEqual(self.dates[2012][2][1], [])
+        self.assertEqual(self.dates[2012][2], {})
+        self.assertEqual(self.dates[2010][1][1], [])
+        self.assertEqual(self.dates.months(2010), [])
+        self.assertEqual(self.dates.years(), [2011, 2012])
+        self.assertFalse(2010 in self.dates)
+
+    def test_archives(self):
+        archives = [(y, m, d, [post['name'] for post in posts]) for y, m, d, posts in self.dates.archives()]
+        self.assertEqual(archives, [
+            (2011, 12, 31, ['a']), (2011, 12, None, ['a']),
+            (2012, 1, 2, ['d']), (2012, 1, None, ['d']),
+            (2012, 3, 4, ['b', 'c']), (2012, 3, None, ['b', 'c'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from mgen.generators import depgraph
+from mgen.generators import manifest
+
+
+def post(postId, sha, day = 1):
+    return {'id': postId, 'hash': sha, 'date': datetime.datetime(2012, 1, day)}
+
+
+class DependencyGraphTest(unittest.TestCase):
+
+    def graph(self, posts):
+        graph = depgraph.DependencyGraph()
+        for each in posts:
+            graph.add_post(each)
+        graph.add_output(u'post/id/a/index.html', [posts[0]], ['post.html'])
+        graph.add_output(u'page/1/index.html', posts, ['page.html', 1])
+        graph.add_output(u'sitemap.xml', posts, [], False)
+        return graph
+
+    def test_edit(self):
+        previous = self.graph([post(u'a', '1'), post(u'b', '2')])
+        graph = self.graph([post(u'a', '3'), post(u'b', '2')])
+        self.assertTrue(graph.is_post_changed(u'a', previous))
+        self.assertFalse(graph.is_post_changed(u'b', previous))
+        #digests are of ids & dates, edited post is looked up in outputs showing it
+        for output in graph.outputs:
+            self.assertFalse(graph.is_changed(output, previous))
+        self.assertEqual(graph.dependents([u'a']), set([u'post/id/a/index.html', u'page/1/index.html']))
+        self.assertEqual(graph.dependents([u'b']), set([u'page/1/index.html']))
+        self.assertEqual(graph.dependents([u'c']), set())
+
+    def test_structure(self):
+        previous = self.graph([post(u'a', '1'), post(u'b', '2')])
+        moved = self.graph([post(u'a', '1'), post(u'b', '2', 2)])
+        self.assertFalse(moved.is_changed(u'post/id/a/index.html', previous))
+        self.assertTrue(moved.is_changed(u'page/1/index.html', previous))
+        self.assertTrue(moved.is_changed(u'sitemap.xml', previous))
+        added = self.graph([post(u'a', '1'), post(u'b', '2'), post(u'c', '4')])
+        self.assertTrue(added.is_post_changed(u'c', previous))
+        self.assertTrue(added.is_changed(u'sitemap.xml', previous))
+
+    def test_keep_output(self):
+        previous = self.graph([post(u'a', '1')])
+        graph = depgraph.DependencyGraph()
+        self.assertTrue(graph.keep_output(u'page/1/index.html', previous))
+        self.assertFalse(graph.keep_output(u'page/2/index.html', previous))
+        self.assertFalse(graph.is_changed(u'page/1/index.html', previous))
+        self.assertTrue(graph.is_changed(u'sitemap.xml', previous))
+
+
+class ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def test_save_load(self):
+        path = os.path.join(self.folder, 'manifest.json')
+        saved = manifest.Manifest(path)
+        saved.options = 'options'
+        saved.graph.add_post(post(u'a', '1'))
+        saved.graph.add_output(u'index.html', [post(u'a', '1')], [])
+        saved.outputs[u'index.html'] = [5, 'hash']
+        saved.outputs[u'robots.txt'] = [3, 'other']
+        saved.save()
+        loaded = manifest.Manifest(path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.options, 'options')
+        self.assertEqual(dict(loaded.outputs), dict(saved.outputs))
+        self.assertEqual(loaded.graph.posts, {u'a': '1'})
+        self.assertEqual(loaded.graph.outputs, saved.graph.outputs)
+        self.assertEqual(loaded.graph.dependents([u'a']), set([u'index.html']))
+
+    def test_other_version(self):
+        path = os.path.join(self.folder, 'manifest.json')
+        with open(path, 'w') as handle:
+            handle.write('{"version": 2, "options": "options"}\n["index.html", [5, "hash"], "digest"]\n')
+        loaded = manifest.Manifest(path)
+        #outputs are read to be removed if not generated again, graph is not
+        self.assertFalse(loaded.load())
+        self.assertEqual(loaded.options, None)
+        self.assertEqual(dict(loaded.outputs), {u'index.html': [5, u'hash']})
+        self.assertEqual(loaded.graph.outputs, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
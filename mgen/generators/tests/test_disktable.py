@@ -0,0 +1,74 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mgen.generators import disktable
+
+
+class DiskTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.table = disktable.DiskTable(os.path.join(self.folder, 'table.db'))
+
+    def tearDown(self):
+        self.table.close()
+        shutil.rmtree(self.folder, True)
+
+    def test_values(self):
+        self.table['a'] = (5, 'hash')
+        self.table[u'\u0431'] = None
+        self.table['c'] = [1, u'two', {'three': 3}]
+        self.assertEqual(self.table['a'], (5, 'hash'))
+        self.assertEqual(self.table[u'\u0431'], None)
+        self.assertEqual(self.table['c'], [1, u'two', {'three': 3}])
+        self.assertTrue(u'\u0431' in self.table)
+        self.assertFalse('d' in self.table)
+        self.assertEqual(self.table.get('d', 1), 1)
+        self.assertRaises(KeyError, lambda: self.table['d'])
+        self.assertEqual(len(self.table), 3)
+
+    def test_keys(self):
+        #ascii unicode and str are the same key, like in a dict
+        self.table[u'index.html'] = 1
+        self.table['index.html'] = 2
+        self.assertEqual(len(self.table), 1)
+        self.assertEqual(self.table[u'index.html'], 2)
+        self.assertEqual(list(self.table), ['index.html'])
+        self.assertTrue(isinstance(list(self.table)[0], str))
+
+    def test_remove(self):
+        self.table.update([('a', 1), ('b', 2)])
+        self.assertEqual(self.table.pop('a'), 1)
+        self.assertEqual(self.table.pop('a', 3), 3)
+        del self.table['b']
+        self.assertRaises(KeyError, self.table.__delitem__, 'b')
+        self.assertEqual(len(self.table), 0)
+
+    def test_iteration(self):
+        batchSize = disktable.batchSize
+        disktable.batchSize = 3
+        try:
+            self.table.update([(str(index), index) for index in range(10)])
+            self.table['4'] = 40
+            self.assertEqual(self.table.items().next(), ('0', 0))
+            items = []
+            for key, value in self.table.items():
+                #keys added while iterating are not listed
+                self.table['new' + key] = value
+                del self.table[key]
+                items.append((key, value))
+            self.assertEqual(items, [(str(index), index * 10 if index == 4 else index) for index in range(10)])
+            self.assertEqual(list(self.table), ['new%d' % index for index in range(10)])
+        finally:
+            disktable.batchSize = batchSize
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from mgen.generators import extsort
+from mgen.generators import tagindex
+from mgen.generators import dateindex
+
+
+class SortedPost(dict):
+    '''Post with a date and sortKey of it, posts are written to runs with cPickle'''
+
+    def __init__(self, name, *date):
+        dict.__init__(self, name = name, date = datetime.datetime(*date))
+        self.sortKey = self['date'].toordinal() * 86400 + self['date'].hour * 3600
+
+def names(posts):
+    return [post['name'] for post in posts]
+
+
+class SortedRunsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def test_order(self):
+        values = [7, 3, 9, 1, 3, 8, 2, 6, 5, 0, 4]
+        for size in [3, 100]:
+            runs = extsort.SortedRuns(self.folder, lambda value, number: (value, number), size)
+            for value in values:
+                runs.append(value)
+            self.assertEqual(len(runs), len(values))
+            self.assertEqual(list(runs), sorted(values))
+            self.assertEqual(runs[2:5], sorted(values)[2:5])
+            self.assertEqual(runs[10], 9)
+            self.assertRaises(IndexError, lambda: runs[11])
+            runs.close()
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_stable(self):
+        #items of the same key are in order they were appended
+        runs = extsort.SortedRuns(self.folder, lambda item, number: (item[0], number), 2)
+        for item in [(1, 'a'), (0, 'b'), (1, 'c'), (0, 'd'), (1, 'e')]:
+            runs.append(item)
+        self.assertEqual(list(runs), [(0, 'b'), (0, 'd'), (1, 'a'), (1, 'c'), (1, 'e')])
+        runs.close()
+
+    def test_groups(self):
+        runs = extsort.SortedRuns(self.folder, lambda value, number: (value % 3, value), 4, lambda key: key[0])
+        for value in range(20):
+            runs.append(value)
+        self.assertEqual(runs.groups, {0: 7, 1: 7, 2: 6})
+        self.assertEqual(runs.select(1), range(1, 20, 3))
+        self.assertEqual(runs.select(3), [])
+        group = extsort.Group(runs, 2)
+        self.assertEqual(len(group), 6)
+        self.assertEqual(list(group), range(2, 20, 3))
+        self.assertEqual(group[-1], 17)
+        self.assertEqual(len(extsort.Group(runs, 3)), 0)
+        #appended after a select
+        runs.append(21)
+        self.assertEqual(runs.select(0), range(0, 22, 3))
+        runs.close()
+
+    def test_pages(self):
+        pages = extsort.Pages(range(7), 3)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages.keys(), [1, 2, 3])
+        self.assertEqual(pages[3], [6])
+        self.assertRaises(KeyError, lambda: pages[4])
+        self.assertRaises(KeyError, lambda: pages[0])
+        self.assertEqual(list(pages.items()), [(1, [0, 1, 2]), (2, [3, 4, 5]), (3, [6])])
+        self.assertEqual(len(extsort.Pages([], 3)), 0)
+
+
+class TagsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.runSize = extsort.runSize
+        extsort.runSize = 2
+        self.posts = [SortedPost('a', 2012, 1, 1), SortedPost('b', 2013, 1, 1), SortedPost('c', 2012, 1, 1),
+            SortedPost('d', 2012, 6, 1), SortedPost('e', 2011, 1, 1)]
+        self.tagged = [('x', 'a'), ('y', 'a'), ('x', 'b'), ('x', 'c'), ('y', 'd'), ('x', 'e'), ('z', 'e')]
+
+    def tearDown(self):
+        extsort.runSize = self.runSize
+        shutil.rmtree(self.folder, True)
+
+    def add(self, index):
+        byName = dict([(post['name'], post) for post in self.posts])
+        for tag, name in self.tagged:
+            index.add(tag, byName[name])
+        return index
+
+    def test_same_as_tag_index(self):
+        tags = self.add(extsort.Tags(self.folder))
+        expected = self.add(tagindex.TagIndex())
+        self.assertEqual(sorted(tags.keys()), sorted(expected.keys()))
+        self.assertEqual(len(tags), 3)
+        for tag in expected:
+            self.assertEqual(names(tags[tag]), names(expected[tag]))
+            self.assertEqual(tags.count(tag), expected.count(tag))
+        self.assertEqual(names(tags['x']), ['b', 'c', 'a', 'e'])
+        self.assertEqual([(tag, names(posts)) for tag, posts in tags.items()],
+            sorted([(tag, names(posts)) for tag, posts in expected.items()]))
+        self.assertFalse('w' in tags)
+        self.assertRaises(KeyError, lambda: tags['w'])
+        tags.close()
+
+
+class DateRunsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def test_same_as_date_index(self):
+        posts = [SortedPost('b', 2012, 3, 4), SortedPost('a', 2011, 12, 31), SortedPost('c', 2012, 3, 4, 1),
+            SortedPost('d', 2012, 1, 2), SortedPost('e', 2012, 3, 4)]
+        runs = extsort.SortedRuns(self.folder, lambda post, number: (post['date'].date(), number), 2,
+            lambda key: key[0])
+        dates = dateindex.DateRuns(runs)
+        expected = dateindex.DateIndex()
+        for post in posts:
+            dates.add(post)
+            expected.add(post)
+        self.assertEqual(dates.years(), expected.years())
+        for y in expected.years():
+            self.assertEqual(dates.months(y), expected.months(y))
+            for m in expected.months(y):
+                self.assertEqual(dates.days(y, m), expected.days(y, m))
+                for d in expected.days(y, m):
+                    self.assertEqual(len(dates[y][m][d]), len(expected[y][m][d]))
+                    self.assertEqual(names(dates[y][m][d]), names(expected[y][m][d]))
+        self.assertEqual(names(dates[2012][3][4]), ['b', 'c', 'e'])
+        self.assertEqual(dates[2012][3][5], [])
+        self.assertEqual([(y, m, d, names(ofDate)) for y, m, d, ofDate in dates.archives()],
+            [(y, m, d, names(ofDate)) for y, m, d, ofDate in expected.archives()])
+        runs.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
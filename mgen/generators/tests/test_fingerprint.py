@@ -0,0 +1,91 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+from mgen.generators import MGEN
+from mgen.generators import sync
+from mgen.generators import helpers
+from mgen.generators import defines
+from mgen.generators import manifest
+from mgen.generators.bench import build, corpus
+from mgen.generators.tests.test_watch import read_tree
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        self.target = os.path.join(self.folder, 'out')
+        corpus.make_site(self.source, posts = 5, tags = 2, bodySize = 200, years = [2012])
+        self.css = os.path.join(self.source, defines.inResources, 'css', 'site.css')
+        self.stdout = sys.stdout
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        helpers.resourceMap = {}
+        shutil.rmtree(self.folder, True)
+
+    def generate(self, **kwargs):
+        '''Files of a build with fingerprinted resources'''
+        sys.stdout = StringIO.StringIO()
+        MGEN(build.build_options(self.source, self.target, years = [2012], fingerprint = True, **kwargs)).generate()
+        return read_tree(self.target)
+
+    def check(self, files):
+        '''Fingerprinted name of site.css in files, checked to be linked from pages'''
+        resources = json.loads(files[defines.resourcesManifest])
+        name = sync.fingerprint_name('css/site.css', manifest.hash_file(self.css))
+        self.assertEqual(resources['css/site.css'], name)
+        with open(self.css, 'rb') as handle:
+            self.assertEqual(files[os.path.join(defines.resources, name)], handle.read())
+        for path in ['index.html', os.path.join('about', 'index.html')]:
+            self.assertTrue('href="/%s/%s"' % (defines.resources, name) in files[path], path)
+        return name
+
+    def test_names(self):
+        self.assertEqual(sync.fingerprint_name('css/site.css', '0123456789abcdef'), 'css/site.0123456789ab.css')
+        helpers.resourceMap = {'css/site.css': 'css/site.0123456789ab.css'}
+        self.assertEqual(helpers.resource('/css/site.css'), '/res/css/site.0123456789ab.css')
+        self.assertEqual(helpers.resource('js/site.js'), '/res/js/site.js')
+
+    def test_build(self):
+        files = self.generate()
+        name = self.check(files)
+        #plain names are kept for links not made by helpers.resource()
+        self.assertEqual(files[os.path.join(defines.resources, 'css', 'site.css')],
+            files[os.path.join(defines.resources, name)])
+
+    def test_changed(self):
+        name = self.check(self.generate())
+        with open(self.css, 'a') as handle:
+            handle.write('p { color: red }\n')
+        files = self.generate()
+        self.assertNotEqual(self.check(files), name)
+        self.assertFalse(os.path.join(defines.resources, name) in files)
+
+    def test_jobs(self):
+        self.check(self.generate(jobs = 2))
+
+    def test_off(self):
+        self.generate()
+        sys.stdout = StringIO.StringIO()
+        MGEN(build.build_options(self.source, self.target, years = [2012])).generate()
+        files = read_tree(self.target)
+        self.assertFalse(defines.resourcesManifest in files)
+        self.assertEqual(sorted([path for path in files if path.startswith(defines.resources + os.sep)]),
+            [os.path.join(defines.resources, 'css', 'site.css'), os.path.join(defines.resources, 'js', 'site.js')])
+        self.assertTrue('href="/%s/css/site.css"' % defines.resources in files['index.html'])
+
+
+if __name__ == '__main__':
+    unittest.main()
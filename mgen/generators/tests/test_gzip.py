@@ -0,0 +1,81 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+from mgen.generators import MGEN
+from mgen.generators import defines
+from mgen.generators.bench import build, corpus
+from mgen.generators.tests.test_watch import read_tree
+
+
+class GzipTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        self.target = os.path.join(self.folder, 'out')
+        corpus.make_site(self.source, posts = 8, tags = 2, bodySize = 300, years = [2012])
+        self.stdout = sys.stdout
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.folder, True)
+
+    def generate(self, **kwargs):
+        '''Files of a build with gzip copies'''
+        sys.stdout = StringIO.StringIO()
+        MGEN(build.build_options(self.source, self.target, years = [2012], gzip = True, **kwargs)).generate()
+        return read_tree(self.target)
+
+    def compressed(self, files):
+        return sorted([path[:-3] for path in files if path.endswith('.gz')])
+
+    def test_written(self):
+        files = self.generate()
+        expected = sorted([path for path, content in files.items() if len(content) >= 512 and
+            os.path.splitext(path)[1] in defines.gzipExtensions])
+        self.assertTrue(os.path.join('post', 'feed.rss') in expected)
+        self.assertEqual(self.compressed(files), expected)
+        for path in expected:
+            self.assertEqual(gzip.GzipFile(fileobj = StringIO.StringIO(files[path + '.gz'])).read(), files[path])
+
+    def test_min_size(self):
+        files = self.generate(gzip_min_size = 0)
+        self.assertTrue('robots.txt' in self.compressed(files))
+        self.assertFalse(os.path.join('res', 'css', 'site.css') in self.compressed(files))
+        files = self.generate(gzip_min_size = 1024 * 1024)
+        self.assertEqual(self.compressed(files), [])
+
+    def test_unchanged(self):
+        self.generate()
+        gzipPath = os.path.join(self.target, 'index.html.gz')
+        os.utime(gzipPath, (0, 0))
+        self.generate()
+        self.assertTrue('  0 files compressed' in sys.stdout.getvalue())
+        self.assertEqual(os.path.getmtime(gzipPath), 0)
+
+    def test_pruned(self):
+        postCopies = lambda files: [path for path in self.compressed(files) if path.startswith(os.path.join('post', 'id'))]
+        posts = len(postCopies(self.generate()))
+        os.remove(os.path.join(self.source, defines.inPosts, 'post000003.md'))
+        files = self.generate()
+        self.assertEqual(len(postCopies(files)), posts - 1)
+        #no copy is left without its file
+        self.assertEqual([path for path in self.compressed(files) if not path in files], [])
+        #copies are removed when gzip is off
+        sys.stdout = StringIO.StringIO()
+        MGEN(build.build_options(self.source, self.target, years = [2012])).generate()
+        self.assertEqual(self.compressed(read_tree(self.target)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+from mgen.generators import MGEN
+from mgen.generators import defines
+from mgen.generators.bench import build, corpus
+from mgen.generators.tests.test_watch import read_tree
+
+
+def empty_folders(folder):
+    '''Relative paths of empty folders in folder'''
+    return [os.path.relpath(root, folder) for root, dirs, names in os.walk(folder) if not dirs and not names]
+
+
+class IncrementalTest(unittest.TestCase):
+    '''Builds after changes of sources, with manifest of the previous build,
+    give the site of a full build'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        self.target = os.path.join(self.folder, 'out')
+        corpus.make_site(self.source, posts = 12, tags = 3, bodySize = 200, years = [2012])
+        self.stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        self.generate(self.target)
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.folder, True)
+
+    def generate(self, target, **kwargs):
+        generator = MGEN(build.build_options(self.source, target, years = [2012], **kwargs))
+        generator.generate()
+        return generator
+
+    def post_path(self, number):
+        return os.path.join(self.source, defines.inPosts, 'post%06d.md' % number)
+
+    def change_header(self, number, name, value):
+        with open(self.post_path(number), 'r') as handle:
+            lines = handle.read().split('\n')
+        lines = [name + ': ' + value if line.startswith(name + ':') else line for line in lines]
+        with open(self.post_path(number), 'w') as handle:
+            handle.write('\n'.join(lines))
+
+    def rebuild(self):
+        '''Profile report of a build after changes, its site is the same as of a full build'''
+        profile = os.path.join(self.folder, 'profile.json')
+        self.generate(self.target, profile = profile)
+        target = os.path.join(self.folder, 'full')
+        self.generate(target, full = True, cache = os.path.join(self.folder, 'cache'))
+        self.assertEqual(read_tree(self.target), read_tree(target))
+        self.assertEqual(empty_folders(self.target), [])
+        with open(profile) as handle:
+            return json.load(handle)
+
+    def test_edit(self):
+        with open(self.post_path(3), 'a') as handle:
+            handle.write('\nOne more paragraph.\n')
+        rendered = self.rebuild()['outputs']
+        self.assertEqual(len([key for key in rendered if key.startswith('post/id/')]), 1)
+        self.assertTrue('index.html' in rendered)
+        self.assertFalse('sitemap.xml' in rendered)
+        self.assertFalse('about/index.html' in rendered)
+
+    def mtimes(self):
+        '''{relative path: mtime} of every output file'''
+        return dict([(path, os.path.getmtime(os.path.join(self.target, path))) for path in read_tree(self.target)])
+
+    def test_unchanged(self):
+        before = self.mtimes()
+        report = self.rebuild()
+        self.assertEqual(report['files']['changed'], 0)
+        self.assertEqual(report['files']['removed'], 0)
+        self.assertEqual(self.mtimes(), before)
+
+    def test_written_if_changed(self):
+        before = self.mtimes()
+        #a trailing newline changes the post file, its pages are rendered again to the same content
+        with open(self.post_path(3), 'a') as handle:
+            handle.write('\n')
+        os.utime(os.path.join(self.target, 'index.html'), (0, 0))
+        report = self.rebuild()
+        self.assertEqual(len([key for key in report['outputs'] if key.startswith('post/id/')]), 1)
+        self.assertEqual(report['files']['changed'], 0)
+        self.assertTrue(report['files']['unchanged'] > 0)
+        self.assertEqual(os.path.getmtime(os.path.join(self.target, 'index.html')), 0)
+        after = self.mtimes()
+        self.assertEqual([path for path in after if path != 'index.html' and after[path] != before[path]], [])
+
+    def test_remove(self):
+        ids = os.listdir(os.path.join(self.target, 'post', 'id'))
+        os.remove(self.post_path(3))
+        report = self.rebuild()
+        self.assertTrue(report['files']['removed'] > 0)
+        self.assertEqual(len(os.listdir(os.path.join(self.target, 'post', 'id'))), len(ids) - 1)
+
+    def test_tag(self):
+        self.change_header(3, 'tags', 'other')
+        self.rebuild()
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'tag', 'other', 'index.html')))
+        self.change_header(3, 'tags', 'tag0')
+        self.rebuild()
+        #pages of a tag no post has anymore are removed
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'tag', 'other')))
+
+    def test_date(self):
+        self.change_header(3, 'date', '01.01.2012, 10.00')
+        self.rebuild()
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'post', 'date', '2012', '1', '1', 'index.html')))
+        self.change_header(3, 'date', '02.01.2012, 10.00')
+        self.rebuild()
+        #pages of a day with no posts anymore are removed
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'post', 'date', '2012', '1', '1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
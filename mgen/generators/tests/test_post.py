@@ -0,0 +1,109 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import cPickle
+import datetime
+import tempfile
+import unittest
+
+from mako.template import Template
+
+from mgen.generators import Post
+from mgen.generators import helpers
+
+summaryTemplate = '''<%def name="summary(post)">${calls.append(post['title']) or ''}${post['title']}</%def>
+${helpers.cached_fragment(context, post, summary, post)}'''
+
+cutTemplate = '''<%def name="cut(post, size, suffix = '')">${calls.append(size) or ''}${post['title'][:size]}${suffix}</%def>
+${helpers.cached_fragment(context, post, cut, post, 2)} ${helpers.cached_fragment(context, post, cut, post, 3)}
+${helpers.cached_fragment(context, post, cut, post, 2, suffix = '.')} ${helpers.cached_fragment(context, post, cut, post, 2)}'''
+
+
+class PostTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'post.md')
+        with open(self.path, 'w') as handle:
+            handle.write('title: Post\n---\nFirst line\n\n  Second line  \n')
+        self.post = Post(self.path)
+        self.post['title'] = u'Post'
+        self.post['date'] = datetime.datetime(2012, 3, 4, 5, 6, 7)
+        self.post['hash'] = 'hash'
+        self.post['author'] = u'Author'
+        self.post.textOffset = len('title: Post\n---\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def test_body_is_read_when_needed(self):
+        self.assertEqual(self.post['text'], [u'First line', u'Second line'])
+        os.remove(self.path)
+        #checks and keys do not read the body
+        self.assertTrue('text' in self.post)
+        self.assertTrue(self.post.has_key('text'))
+        self.assertTrue('text' in self.post.keys())
+        self.assertFalse('tags' in self.post)
+        self.assertRaises(IOError, self.post.items)
+
+    def test_dict_access(self):
+        self.assertEqual(self.post['author'], u'Author')
+        self.assertEqual(self.post.get('tags', []), [])
+        self.assertRaises(KeyError, lambda: self.post['tags'])
+        self.post.update({'tags': [u'a']}, lang = u'en')
+        self.assertEqual(self.post['tags'], [u'a'])
+        self.assertEqual(self.post['lang'], u'en')
+        self.assertEqual(dict(self.post.items())['text'], [u'First line', u'Second line'])
+
+    def test_dict_protocol(self):
+        keys = ['title', 'date', 'template', 'hash', 'text', 'author']
+        self.assertEqual(list(self.post), keys)
+        self.assertEqual(list(self.post.iterkeys()), keys)
+        self.assertEqual(len(self.post), 6)
+        self.assertEqual(self.post.values(), [value for name, value in self.post.items()])
+        self.assertEqual(list(self.post.itervalues()), self.post.values())
+        self.assertEqual(list(self.post.iteritems()), self.post.items())
+        self.assertEqual(dict(self.post)['author'], u'Author')
+        self.assertEqual(len(Post()), 1)
+
+    def test_sort_key(self):
+        later = Post()
+        later['date'] = datetime.datetime(2012, 3, 4, 5, 6, 8)
+        self.assertTrue(self.post < later)
+        self.assertEqual(sorted([later, self.post]), [self.post, later])
+
+    def test_pickle(self):
+        post = cPickle.loads(cPickle.dumps(self.post, cPickle.HIGHEST_PROTOCOL))
+        self.assertEqual(post.items(), self.post.items())
+        self.assertEqual(post.sortKey, self.post.sortKey)
+
+    def test_fragment_by_hash(self):
+        helpers.fragmentCache.clear()
+        template = Template(summaryTemplate)
+        calls = []
+        copy = cPickle.loads(cPickle.dumps(self.post))
+        for post in [self.post, copy]:
+            self.assertEqual(template.render(helpers = helpers, post = post, calls = calls).strip(), u'Post')
+        #posts of the same content share a fragment, another post has its own
+        self.assertEqual(calls, [u'Post'])
+        copy['hash'] = 'other hash'
+        template.render(helpers = helpers, post = copy, calls = calls)
+        self.assertEqual(calls, [u'Post', u'Post'])
+        helpers.fragmentCache.clear()
+
+    def test_fragment_by_arguments(self):
+        helpers.fragmentCache.clear()
+        calls = []
+        content = Template(cutTemplate).render(helpers = helpers, post = self.post, calls = calls)
+        #arguments are a part of the key
+        self.assertEqual(content.split(), [u'Po', u'Pos', u'Po.', u'Po'])
+        self.assertEqual(calls, [2, 3, 2])
+        helpers.fragmentCache.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mgen.generators import postcache
+
+
+class PostCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cachePath = os.path.join(self.folder, 'cache', 'posts.pickle')
+        self.parsed = []
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def post_file(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as handle:
+            handle.write(content)
+        return path
+
+    def parse(self, path):
+        self.parsed.append(path)
+        with open(path, 'r') as handle:
+            return {'text': handle.read()}
+
+    def test_unchanged_files_are_not_parsed(self):
+        first = self.post_file('first.md', 'first')
+        second = self.post_file('second.md', 'second')
+        cache = postcache.PostCache(self.cachePath, 'options')
+        cache.get(first, self.parse)
+        cache.get(second, self.parse)
+        cache.save()
+
+        self.parsed = []
+        cache = postcache.PostCache(self.cachePath, 'options')
+        self.assertTrue(cache.load())
+        self.assertEqual(cache.get(first, self.parse), {'text': 'first'})
+        #size of the file is a part of the key
+        self.post_file('second.md', 'second, changed')
+        self.assertEqual(cache.get(second, self.parse), {'text': 'second, changed'})
+        self.assertEqual(self.parsed, [second])
+
+    def test_other_options(self):
+        path = self.post_file('post.md', 'post')
+        cache = postcache.PostCache(self.cachePath, 'options')
+        cache.get(path, self.parse)
+        cache.save()
+        self.assertFalse(postcache.PostCache(self.cachePath, 'other options').load())
+
+    def test_removed_posts_are_dropped(self):
+        first = self.post_file('first.md', 'first')
+        second = self.post_file('second.md', 'second')
+        cache = postcache.PostCache(self.cachePath, 'options')
+        cache.get(first, self.parse)
+        cache.get(second, self.parse)
+        cache.save()
+
+        cache = postcache.PostCache(self.cachePath, 'options')
+        cache.load()
+        cache.get(first, self.parse)
+        cache.save()
+        cache = postcache.PostCache(self.cachePath, 'options')
+        cache.load()
+        self.assertEqual(cache.posts.keys(), [first])
+
+    def test_unchecked(self):
+        path = self.post_file('post.md', 'post')
+        cache = postcache.PostCache(self.cachePath, 'options')
+        cache.get(path, self.parse)
+        cache.reuse()
+        self.post_file('post.md', 'post, changed')
+        #without check the file is not looked at
+        self.assertEqual(cache.get(path, self.parse, False), {'text': 'post'})
+        self.assertEqual(cache.get(path, self.parse), {'text': 'post, changed'})
+
+    def test_broken_cache(self):
+        os.makedirs(os.path.dirname(self.cachePath))
+        with open(self.cachePath, 'w') as handle:
+            handle.write('broken')
+        self.assertFalse(postcache.PostCache(self.cachePath, 'options').load())
+
+
+if __name__ == '__main__':
+    unittest.main()
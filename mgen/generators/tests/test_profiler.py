@@ -0,0 +1,97 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from mgen.generators import MGEN
+from mgen.generators import backends
+from mgen.generators import profiler
+from mgen.generators.bench import build, corpus
+
+
+def spin(seconds):
+    '''Use seconds of cpu time'''
+    while sum(os.times()[:2]) < seconds:
+        pass
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def test_disabled(self):
+        profile = profiler.Profiler()
+        profile.phase('posts')
+        profile.template('post.html', 1.0)
+        profile.output('post/id/1/index.html', 1.0)
+        profile.save(os.path.join(self.folder, 'profile.json'), {})
+        with open(os.path.join(self.folder, 'profile.json')) as handle:
+            report = json.load(handle)
+        self.assertEqual(report['phases'], [])
+        self.assertEqual(report['templates'], {})
+        self.assertEqual(report['outputs'], {})
+
+    def test_report(self):
+        profile = profiler.Profiler(True)
+        profile.phase('posts')
+        profile.template('post.html', 1.0)
+        profile.template('post.html', 2.0)
+        profile.output('post/id/1/index.html', 2.0)
+        profile.phase('tags')
+        profile.save(os.path.join(self.folder, 'profile.json'), {'changed': 1})
+        with open(os.path.join(self.folder, 'profile.json')) as handle:
+            report = json.load(handle)
+        self.assertEqual([phase['name'] for phase in report['phases']], ['posts', 'tags'])
+        self.assertEqual(report['templates'], {'post.html': {'count': 2, 'wall': 3.0}})
+        self.assertEqual(report['outputs'], {'post/id/1/index.html': 2.0})
+        self.assertEqual(report['files'], {'changed': 1})
+        self.assertEqual(sorted(report['total'].keys()), ['cpu', 'wall'])
+        self.assertFalse('stats' in report)
+
+    def test_build(self):
+        source = os.path.join(self.folder, 'site')
+        target = os.path.join(self.folder, 'out')
+        path = os.path.join(self.folder, 'profile.json')
+        corpus.make_site(source, posts = 5, tags = 2, bodySize = 200, years = [2012])
+        MGEN(build.build_options(source, target, years = [2012], profile = path),
+            backends.MemoryBackend(target)).generate()
+        with open(path) as handle:
+            report = json.load(handle)
+        self.assertEqual(sorted(report.keys()), ['files', 'outputs', 'phases', 'templates', 'total'])
+        names = [phase['name'] for phase in report['phases']]
+        for name in ['setup', 'posts', 'pages', 'tags', 'indexes', 'feeds', 'sitemap']:
+            self.assertTrue(name in names, name)
+        self.assertEqual(report['templates']['post.html']['count'], 5)
+        self.assertTrue('index.html' in report['outputs'])
+        self.assertEqual(len([key for key in report['outputs'] if key.startswith('post/id/')]), 5)
+        self.assertTrue(report['files']['changed'] > 0)
+        #inline templates are named by their source files
+        self.assertTrue('about.html' in report['templates'])
+        self.assertTrue('robots.txt' in report['templates'])
+
+    def test_child_cpu(self):
+        profile = profiler.Profiler(True)
+        profile.phase('render')
+        worker = multiprocessing.Process(target = spin, args = (0.3,))
+        worker.start()
+        worker.join()
+        profile.save(os.path.join(self.folder, 'profile.json'), {})
+        with open(os.path.join(self.folder, 'profile.json')) as handle:
+            report = json.load(handle)
+        #cpu of ended child processes is counted
+        self.assertTrue(report['phases'][0]['cpu'] >= 0.25, report['phases'][0]['cpu'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+from mgen.generators import MGEN
+from mgen.generators import render
+from mgen.generators import defines
+from mgen.generators.bench import build, corpus
+from mgen.generators.tests.test_watch import read_tree
+
+
+class TemplateCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        self.options = build.build_options(self.source, os.path.join(self.folder, 'out'), years = [2012],
+            cache = os.path.join(self.folder, 'cache'))
+        self.templates = os.path.join(self.options.cache, defines.templatesCache)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def cached(self):
+        return sorted(os.listdir(self.templates))
+
+    def age(self):
+        '''Make every cached template look unused since an hour'''
+        for name in os.listdir(self.templates):
+            os.utime(os.path.join(self.templates, name), (time.time() - 3600, time.time() - 3600))
+
+    def test_prune_inline(self):
+        used = render.inline_template(u'used ${1 + 1}', self.options)
+        unused = render.inline_template(u'unused', self.options)
+        key = render.source_hash(u'used ${1 + 1}')
+        self.assertEqual(self.cached(), sorted([key + '.mako', key + '.py',
+            render.source_hash(u'unused') + '.mako', render.source_hash(u'unused') + '.py']))
+        self.age()
+        #templates used again are kept
+        self.assertTrue(render.inline_template(u'used ${1 + 1}', self.options) is used)
+        self.assertEqual(render.prune_templates(self.options, int(time.time()) - 60), 2)
+        self.assertEqual(self.cached(), [key + '.mako', key + '.py'])
+        self.assertEqual(used.render(), 'used 2')
+        self.assertFalse(render.inline_template(u'unused', self.options) is unused)
+
+    def test_prune_lookup(self):
+        templatesFolder = os.path.join(self.source, defines.inTemplates)
+        os.makedirs(templatesFolder)
+        for name, content in [('base.html', 'base ${self.body()}'), ('a.html', '<%inherit file="base.html"/>a'),
+                ('b.html', '<%inherit file="base.html"/>b')]:
+            with open(os.path.join(templatesFolder, name), 'w') as handle:
+                handle.write(content)
+        self.assertEqual(render.template_lookup(self.options).get_template('a.html').render().strip(), 'base a')
+        self.assertEqual(len(self.cached()), 2)
+        self.age()
+        self.assertEqual(render.template_lookup(self.options).get_template('b.html').render().strip(), 'base b')
+        #compiled base template is used by the other template too
+        self.assertEqual(render.prune_templates(self.options, int(time.time()) - 60), 1)
+        self.assertEqual(len(self.cached()), 2)
+
+    def test_changed_page(self):
+        corpus.make_site(self.source, posts = 2, tags = 1, bodySize = 100, years = [2012])
+        self.options.watch = True
+        stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            generator = MGEN(self.options)
+            generator.generate()
+            page = os.path.join(self.source, defines.inPages, 'about.html')
+            for index in range(3):
+                with open(page, 'a') as handle:
+                    handle.write('<p>%d</p>\n' % index)
+                generator.generate([page])
+        finally:
+            sys.stdout = stdout
+        #inline templates of the last about page & robots.txt
+        self.assertEqual(len([name for name in self.cached() if name.endswith('.mako')]), 2)
+
+
+class JobsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        corpus.make_site(self.source, posts = 30, tags = 4, bodySize = 300, years = [2012, 2013], templates = 2)
+        self.stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.folder, True)
+
+    def generate(self, name, **kwargs):
+        '''Files of a full build to folder name'''
+        target = os.path.join(self.folder, name)
+        MGEN(build.build_options(self.source, target, years = [2012, 2013], full = True,
+            cache = os.path.join(self.folder, name + '-cache'), **kwargs)).generate()
+        return read_tree(target)
+
+    def test_same_output(self):
+        serial = self.generate('serial')
+        self.assertEqual(self.generate('jobs', jobs = 2), serial)
+
+    def test_rebuild(self):
+        target = os.path.join(self.folder, 'jobs')
+        MGEN(build.build_options(self.source, target, years = [2012, 2013], jobs = 2)).generate()
+        with open(os.path.join(self.source, defines.inPosts, 'post000003.md'), 'a') as handle:
+            handle.write('\nOne more paragraph.\n')
+        MGEN(build.build_options(self.source, target, years = [2012, 2013], jobs = 2)).generate()
+        self.assertEqual(read_tree(target), self.generate('serial'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mgen.generators import sync
+from mgen.generators.tests.test_watch import read_tree
+
+
+class SyncTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'source')
+        self.target = os.path.join(self.folder, 'target')
+        for path, content in [('site.css', 'body {}\n'), (os.path.join('js', 'site.js'), 'var a;\n'),
+                (os.path.join('js', 'lib', 'lib.js'), 'var b;\n')]:
+            self.write(self.source, path, content)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def write(self, folder, path, content):
+        path = os.path.join(folder, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as handle:
+            handle.write(content)
+
+    def test_copy(self):
+        self.assertEqual(sync.sync_tree(self.source, self.target), (3, 0, 0))
+        self.assertEqual(read_tree(self.target), read_tree(self.source))
+        self.assertEqual(sync.sync_tree(self.source, self.target), (0, 3, 0))
+
+    def test_changed(self):
+        sync.sync_tree(self.source, self.target)
+        #same size, other content
+        self.write(self.source, 'site.css', 'body {{\n')
+        os.utime(os.path.join(self.source, 'site.css'), (1000, 1000))
+        #same content, other mtime
+        os.utime(os.path.join(self.source, 'js', 'site.js'), (0, 0))
+        self.assertEqual(sync.sync_tree(self.source, self.target), (1, 2, 0))
+        self.assertEqual(read_tree(self.target), read_tree(self.source))
+        self.assertEqual(os.path.getmtime(os.path.join(self.target, 'js', 'site.js')), 0)
+
+    def test_remove(self):
+        self.write(self.target, 'old.css', 'old\n')
+        self.write(self.target, os.path.join('old', 'deep', 'old.js'), 'old\n')
+        self.write(self.target, os.path.join('js', 'old.js'), 'old\n')
+        self.assertEqual(sync.sync_tree(self.source, self.target), (3, 0, 3))
+        self.assertEqual(read_tree(self.target), read_tree(self.source))
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'old')))
+
+    def test_folder_replaced(self):
+        self.write(self.target, 'lib', 'a file\n')
+        shutil.move(os.path.join(self.source, 'js', 'lib'), os.path.join(self.source, 'lib'))
+        self.assertEqual(sync.sync_tree(self.source, self.target), (3, 0, 0))
+        self.assertEqual(read_tree(self.target), read_tree(self.source))
+
+    def test_aliases(self):
+        copied, unchanged, removed = sync.sync_tree(self.source, self.target, {u'site.css': u'site.0123.css'})
+        self.assertEqual((copied, unchanged, removed), (4, 0, 0))
+        with open(os.path.join(self.target, 'site.0123.css')) as handle:
+            self.assertEqual(handle.read(), 'body {}\n')
+        #alias no longer wanted is removed
+        self.assertEqual(sync.sync_tree(self.source, self.target), (0, 3, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'site.0123.css')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from mgen.generators import MGEN
+from mgen.generators import backends
+from mgen.generators import tagindex
+from mgen.generators.bench import build, corpus
+
+
+class TimedPost(dict):
+
+    def __init__(self, name, sortKey):
+        dict.__init__(self, name = name)
+        self.sortKey = sortKey
+
+
+class TagIndexTest(unittest.TestCase):
+
+    def test_page_count(self):
+        self.assertEqual(tagindex.page_count(0, 10), 0)
+        self.assertEqual(tagindex.page_count(1, 10), 1)
+        self.assertEqual(tagindex.page_count(10, 10), 1)
+        self.assertEqual(tagindex.page_count(11, 10), 2)
+
+    def test_paginate(self):
+        self.assertEqual(list(tagindex.paginate(range(5), 2)), [(1, 3, [0, 1]), (2, 3, [2, 3]), (3, 3, [4])])
+        self.assertEqual(list(tagindex.paginate(range(2), 10)), [(1, 1, [0, 1])])
+        self.assertEqual(list(tagindex.paginate([], 10)), [])
+
+    def test_newest_first(self):
+        index = tagindex.TagIndex()
+        for name, sortKey, tags in [('a', 1, ['x']), ('b', 3, ['x', 'y']), ('c', 1, ['x']), ('d', 2, ['y'])]:
+            for tag in tags:
+                index.add(tag, TimedPost(name, sortKey))
+        #posts of the same time are in reverse order they were added
+        self.assertEqual([post['name'] for post in index['x']], ['b', 'c', 'a'])
+        self.assertEqual([post['name'] for post in index['y']], ['b', 'd'])
+        self.assertEqual(index.count('x'), 3)
+        self.assertEqual(sorted(index.keys()), ['x', 'y'])
+        self.assertFalse('z' in index)
+        #posts added after a read are sorted on the next read
+        index.add('y', TimedPost('e', 4))
+        self.assertEqual([post['name'] for post in index['y']], ['e', 'b', 'd'])
+
+
+class TagPagesTest(unittest.TestCase):
+    '''Tag pages of a small site built to memory, page template prints Page N of M'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        self.target = os.path.join(self.folder, 'out')
+        corpus.make_site(self.source, posts = 7, tags = 2, bodySize = 200, years = [2012])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, True)
+
+    def pages(self, **options):
+        '''{(tag, number): (number, total)} of tag pages built with options'''
+        backend = backends.MemoryBackend(self.target)
+        MGEN(build.build_options(self.source, self.target, years = [2012], **options), backend).generate()
+        tagsFolder = os.path.join(self.target, 'tag') + os.sep
+        pages = {}
+        for path, content in backend.files.items():
+            parts = path[len(tagsFolder):].split(os.sep)
+            if path.startswith(tagsFolder) and len(parts) == 3:
+                number, total = re.search(r'Page (\d+) of (\d+)', content).groups()
+                pages[(parts[0], parts[1])] = (int(number), int(total))
+        return pages
+
+    def test_single_page(self):
+        pages = self.pages()
+        self.assertEqual(pages, {('tag0', '1'): (1, 1), ('tag1', '1'): (1, 1)})
+
+    def test_pages(self):
+        pages = self.pages(posts = 2)
+        for tag in ['tag0', 'tag1']:
+            numbers = sorted([pages[key] for key in pages if key[0] == tag])
+            total = numbers[0][1]
+            self.assertEqual(numbers, [(number, total) for number in range(1, total + 1)])
+        self.assertEqual(self.pages(posts = 2, low_memory = True), pages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import unittest
+
+from mgen.generators.texthlp import cut
+
+
+class CutTest(unittest.TestCase):
+
+    def test_short_text(self):
+        self.assertEqual(cut('short', 10), 'short')
+
+    def test_plain_text(self):
+        #break points of plain text are the same as of the cut before markup was counted out
+        self.assertEqual(cut('Hello world, this is a test.', 12), 'Hello')
+        self.assertEqual(cut('one two three four five six', 10), 'one two')
+
+    def test_no_break(self):
+        self.assertEqual(cut('abcdefghijklmnop', 5), 'abcdefghijklmnop')
+
+    def test_open_tags_closed(self):
+        self.assertEqual(cut('<p>Hello <b>bold world</b> and more text</p>', 15), '<p>Hello <b>bold</b></p>')
+
+    def test_markup_not_counted(self):
+        #breaks inside attributes are not break points
+        self.assertEqual(cut('<a href="http://example.com/a,b">link text here</a> tail', 8),
+            '<a href="http://example.com/a,b">link</a>')
+        self.assertEqual(cut('<!-- a, b --><p>x y z w</p>', 5), '<!-- a, b --><p>x y</p>')
+
+    def test_entity_is_one_character(self):
+        self.assertEqual(cut('<p>caf&eacute; au lait, tr&egrave;s bien</p>', 12), '<p>caf&eacute; au</p>')
+
+    def test_void_tags(self):
+        self.assertEqual(cut('<p>one<br/>two three four</p>', 10), '<p>one<br/>two</p>')
+        self.assertEqual(cut('<p>one<br>two three four</p>', 10), '<p>one<br>two</p>')
+
+    def test_long_text(self):
+        #cut does not depend on text after the cut
+        text = '<p>%s</p>' % ' '.join(['word'] * 100000)
+        self.assertEqual(cut(text, 12), '<p>word word</p>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+from mgen.generators import MGEN
+from mgen.generators import defines
+from mgen.generators.bench import build, corpus
+
+
+def read_tree(folder):
+    '''{relative path: content} of every file in folder'''
+    files = {}
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            with open(os.path.join(root, name), 'rb') as handle:
+                files[os.path.relpath(os.path.join(root, name), folder)] = handle.read()
+    return files
+
+
+class WatchTest(unittest.TestCase):
+    '''Builds of a watching generator after changes of posts give the site of a full build'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'site')
+        self.target = os.path.join(self.folder, 'out')
+        corpus.make_site(self.source, posts = 12, tags = 3, bodySize = 200, years = [2012])
+        self.stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        self.generator = MGEN(build.build_options(self.source, self.target, years = [2012], watch = True))
+        self.generator.generate()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.folder, True)
+
+    def post_path(self, number):
+        return os.path.join(self.source, defines.inPosts, 'post%06d.md' % number)
+
+    def rebuild(self, paths):
+        '''Files written by a watch build of changed paths'''
+        sys.stdout = StringIO.StringIO()
+        self.generator.generate(paths)
+        target = os.path.join(self.folder, 'full')
+        MGEN(build.build_options(self.source, target, years = [2012], full = True,
+            cache = os.path.join(self.folder, 'cache'))).generate()
+        self.assertEqual(read_tree(self.target), read_tree(target))
+        return [os.path.relpath(path, self.target) for path in self.generator.writer.files]
+
+    def test_edit(self):
+        with open(self.post_path(3), 'a') as handle:
+            handle.write('\nOne more paragraph.\n')
+        written = self.rebuild([self.post_path(3)])
+        self.assertTrue('Updating posts' in sys.stdout.getvalue())
+        self.assertTrue('index.html' in written)
+        self.assertFalse('sitemap.xml' in written)
+        self.assertFalse('robots.txt' in written)
+
+    def test_tags(self):
+        with open(self.post_path(3), 'r') as handle:
+            content = handle.read()
+        with open(self.post_path(3), 'w') as handle:
+            handle.write(content.replace('tags: ', 'tags: other, ', 1))
+        written = self.rebuild([self.post_path(3)])
+        #tag pages are added, site is built
+        self.assertFalse('Updating posts' in sys.stdout.getvalue())
+        self.assertTrue(os.path.join('tag', 'other', '1', 'index.html') in written)
+        self.assertTrue('sitemap.xml' in written)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+from xml.dom import minidom
+
+from mgen.generators import MGEN
+from mgen.generators import backends
+from mgen.generators import pipeline
+from mgen.generators import xmlstream
+from mgen.generators.bench import build, corpus
+
+
+class XmlStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = backends.MemoryBackend('/site')
+        self.writer = pipeline.Writer(self.backend, threads = 1)
+
+    def tearDown(self):
+        self.writer.close()
+
+    def test_feed(self):
+        feed = xmlstream.FeedWriter(self.writer.open('/site/feed.rss'), 'Tom & Jerry', 'http://localhost', '<desc>', 'en')
+        feed.item(u'Caf\xe9 <b>', 'Sun, 01 January 2012', 'a < b', 'http://localhost/post/id/1')
+        feed.item('Caf\xc3\xa9', 'Mon, 02 January 2012', '', 'http://localhost/post/id/2')
+        feed.close()
+        content = self.backend.read('/site/feed.rss')
+        self.assertTrue('      <title>Tom &amp; Jerry</title>\n' in content)
+        self.assertTrue('      <description>&lt;desc&gt;</description>\n' in content)
+        self.assertTrue('        <item>\n            <title>Caf\xc3\xa9 &lt;b&gt;</title>\n' in content)
+        self.assertTrue(content.endswith('        </item>\n   </channel>\n</rss>\n'))
+        document = minidom.parseString(content)
+        titles = [node.firstChild.data for node in document.getElementsByTagName('title')]
+        self.assertEqual(titles, [u'Tom & Jerry', u'Caf\xe9 <b>', u'Caf\xe9'])
+
+    def urls(self, path):
+        document = minidom.parseString(self.backend.read(path))
+        return [node.firstChild.data for node in document.getElementsByTagName('loc')]
+
+    def test_sitemap(self):
+        siteMap = xmlstream.SitemapWriter(self.writer, '/site/sitemap.xml', 'http://localhost/', 3)
+        for index in range(3):
+            siteMap.url('http://localhost/post/id/%d?a&b' % index)
+        self.assertEqual(siteMap.close(), [])
+        self.assertEqual(self.urls('/site/sitemap.xml'), ['http://localhost/post/id/%d?a&b' % index for index in range(3)])
+        self.assertTrue('    <url>\n        <loc>http://localhost/post/id/0?a&amp;b</loc>\n    </url>\n' in
+            self.backend.read('/site/sitemap.xml'))
+
+    def test_empty_sitemap(self):
+        siteMap = xmlstream.SitemapWriter(self.writer, '/site/sitemap.xml', 'http://localhost/')
+        self.assertEqual(siteMap.close(), [])
+        self.assertEqual(self.urls('/site/sitemap.xml'), [])
+
+    def test_shards(self):
+        siteMap = xmlstream.SitemapWriter(self.writer, '/site/sitemap.xml', 'http://localhost/', 3)
+        for index in range(7):
+            siteMap.url('http://localhost/post/id/%d' % index)
+        shards = ['/site/sitemap-1.xml', '/site/sitemap-2.xml', '/site/sitemap-3.xml']
+        self.assertEqual(siteMap.close(), shards)
+        self.assertEqual(self.urls('/site/sitemap.xml'), ['http://localhost/sitemap-%d.xml' % number for number in [1, 2, 3]])
+        self.assertTrue('<sitemapindex' in self.backend.read('/site/sitemap.xml'))
+        urls = sum([self.urls(shard) for shard in shards], [])
+        self.assertEqual(urls, ['http://localhost/post/id/%d' % index for index in range(7)])
+        self.assertEqual(len(self.urls('/site/sitemap-3.xml')), 1)
+
+
+class SitemapBuildTest(unittest.TestCase):
+    '''Site map of a small site built to memory'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.limit = xmlstream.sitemapUrls
+
+    def tearDown(self):
+        xmlstream.sitemapUrls = self.limit
+        shutil.rmtree(self.folder, True)
+
+    def build(self):
+        source = os.path.join(self.folder, 'site')
+        target = os.path.join(self.folder, 'out')
+        corpus.make_site(source, posts = 5, tags = 2, bodySize = 200, years = [2012])
+        backend = backends.MemoryBackend(target)
+        MGEN(build.build_options(source, target, years = [2012]), backend).generate()
+        read = lambda name: minidom.parseString(backend.files[os.path.join(target, name)])
+        urls = lambda name: [node.firstChild.data for node in read(name).getElementsByTagName('loc')]
+        return backend, target, urls
+
+    def test_urls(self):
+        backend, target, urls = self.build()
+        siteUrls = urls('sitemap.xml')
+        self.assertEqual(len(siteUrls), len(set(siteUrls)))
+        #single page of posts is listed, as every day with posts, once
+        self.assertTrue('http://localhost/page/1' in siteUrls)
+        self.assertFalse('http://localhost/page/2' in siteUrls)
+        days = [url for url in siteUrls if url.startswith('http://localhost/post/date/')]
+        self.assertTrue(days)
+        for url in days:
+            self.assertTrue(url.endswith('/index.html'))
+            self.assertTrue(os.path.join(target, url[len('http://localhost/'):]) in backend.files)
+        self.assertEqual(len([url for url in siteUrls if url.startswith('http://localhost/post/id/')]), 5)
+        self.assertFalse(os.path.join(target, 'sitemap-1.xml') in backend.files)
+
+    def test_shards(self):
+        xmlstream.sitemapUrls = 4
+        backend, target, urls = self.build()
+        shards = urls('sitemap.xml')
+        self.assertTrue(len(shards) > 1)
+        siteUrls = []
+        for number, url in enumerate(shards):
+            self.assertEqual(url, 'http://localhost/sitemap-%d.xml' % (number + 1))
+            shardUrls = urls('sitemap-%d.xml' % (number + 1))
+            self.assertTrue(0 < len(shardUrls) <= 4)
+            siteUrls.extend(shardUrls)
+        self.assertTrue('http://localhost/page/1' in siteUrls)
+        self.assertEqual(len(siteUrls), len(set(siteUrls)))
+
+
+if __name__ == '__main__':
+    unittest.main()
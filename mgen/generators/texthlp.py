@@ -3,63 +3,98 @@
 # Copyright Stanislav Yudin, 2010
 #
 
+import re
 import string
-import logging
+
+# Elements without closing tag
+voidTags = ['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+	'link', 'meta', 'param', 'source', 'track', 'wbr']
+
+# Characters text can be cut at
+breakChars = string.whitespace + '.!?,;'
 
 def shoudBreak(char):
-	return (char in string.whitespace) or (char in ['.', '!', '?', ',', ';'])
-	
-def isTagStart(char):
-	return char == '<'
+	return char in breakChars
+
+# Markup in html text: comments, tags and character entities
+markupRe = re.compile(r'<!--.*?-->|<[^>]*>|&#?[0-9a-zA-Z]{1,8};', re.S)
+markupStartRe = re.compile(r'[<&]')
 
-def isTagEnd(char):
-	return char == '>'
-	
-def inTag(text, index):
-	startFound = False
-	endFound = False
-	startAt = 0
-	endAt = 0
-	if text[index] in ['<', '>']:
-		return False, 0, 0
-	
-	for delta in xrange(1, len(text) - index):
-		if not endFound and index + delta < len(text) and isTagEnd(text[index + delta]):
-			endFound = True
-			endAt = index + delta
-			logging.debug('found +%d : %s' % (delta, text[index + delta]))
+def tagName(tag):
+	'''Name of tag markup, i.e. "a" for <a href=...>, "/p" for </p>'''
+	tag = tag[1:-1].strip()
+	name = tag.split(None, 1)[0] if tag else ''
+	return name.rstrip('/').lower()
+
+def lastBreak(text, start, end):
+	'''Index of last break character in text[start:end], or -1'''
+	return max([text.rfind(char, start, end) for char in breakChars])
+
+def nextMarkup(text, start, end):
+	'''First markup starting in text[start:end], or None'''
+	while True:
+		found = markupStartRe.search(text, start, end)
+		if not found:
+			return None
+		markup = markupRe.match(text, found.start())
+		if markup:
+			return markup
+		#unterminated markup is plain text
+		start = found.start() + 1
 
-		if not startFound and index - delta >= 0 and isTagStart(text[index - delta]):
-			startFound = True
-			startAt = index - delta
-			logging.debug('found -%d : %s' % (delta, text[index - delta]))
-		
-		if (startFound and endFound):
-			logging.debug('found tag <%d,%d>' % (startAt, endAt))
-			return (startFound and endFound), startAt, endAt
 
-	return False, 0, 0
-	
-	
 ### cut processing ###
-	
+
 def cut(text, lenght):
+	'''Cut text to at most lenght visible characters on a break character, never inside
+	a tag or entity. Tags left open by the cut are closed. Markup is not counted,
+	an entity counts as one character. Text is scanned once, up to the cut'''
 	#too small
 	if len(text) <= lenght:
 		return text
-		
-	#scan text
-	
-	isInTag, tagStart, tagEnd = inTag(text, lenght)
-	if isInTag:
-		if tagStart > 1 :
-			return text[:tagStart - 1]
-		else:
-			return text[:tagEnd + 1]
-	else:
-		for index in reversed(range(0, lenght - 1)):
-			if shoudBreak(text[index]):
-				return text[:index]
-		
+
+	openTags = []
+	visible = 0
+	cutAt = -1
+	cutTags = ()
+	position = 0
+	while True:
+		#plain text up to next markup, or up to the first character over lenght
+		windowEnd = min(len(text), position + lenght - visible + 1)
+		markup = nextMarkup(text, position, windowEnd)
+		end = markup.start() if markup else windowEnd
+		limit = min(end, position + lenght - 1 - visible)
+		if limit > position:
+			index = lastBreak(text, position, limit)
+			if index >= 0:
+				cutAt = index
+				cutTags = tuple(openTags)
+		visible += end - position
+		if visible > lenght:
+			break
+		if markup is None:
+			#all text fits
+			return text
+
+		#markup itself
+		token = markup.group()
+		if token.startswith('&'):
+			visible += 1
+			if visible > lenght:
+				break
+		elif not token.startswith('<!') and not token.startswith('<?'):
+			name = tagName(token)
+			if name.startswith('/'):
+				if name[1:] in openTags:
+					#close the tag and anything left open inside it
+					while openTags.pop() != name[1:]:
+						pass
+			elif name and not token.endswith('/>') and not name in voidTags:
+				openTags.append(name)
+		position = markup.end()
+
 	#no sutable place found, return all
-	return text
\ No newline at end of file
+	if cutAt < 0:
+		return text
+
+	return text[:cutAt] + ''.join(['</%s>' % name for name in reversed(cutTags)])
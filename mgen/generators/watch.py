@@ -0,0 +1,73 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+import time
+
+#inotify is optional, folders are polled without it
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+
+if pyinotify:
+    class IgnoreEvents(pyinotify.ProcessEvent):
+        '''Events only wake the watcher, changes are found by a snapshot'''
+        def process_default(self, event):
+            pass
+
+
+def snapshot(folders):
+    '''(mtime, size) of every file in folders by path'''
+    state = {}
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                state[path] = (stat.st_mtime, stat.st_size)
+    return state
+
+def changes(old, new):
+    '''Paths added, removed or modified between two snapshots'''
+    return sorted([path for path in set(old).union(new) if old.get(path) != new.get(path)])
+
+
+class Watcher(object):
+    '''Waits for changes of files in folders, with inotify if available,
+    otherwise polling every interval seconds'''
+
+    def __init__(self, folders, interval = 0.5):
+        self.folders = [folder for folder in folders if os.path.exists(folder)]
+        self.interval = interval
+        self.state = snapshot(self.folders)
+        self.notifier = None
+        if pyinotify:
+            manager = pyinotify.WatchManager()
+            mask = pyinotify.IN_CREATE | pyinotify.IN_DELETE | pyinotify.IN_CLOSE_WRITE | \
+                pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO
+            for folder in self.folders:
+                manager.add_watch(folder, mask, rec = True, auto_add = True)
+            self.notifier = pyinotify.Notifier(manager, IgnoreEvents(), timeout = int(interval * 1000))
+
+    def wait(self):
+        '''Blocks until files change, returns changed paths'''
+        while True:
+            if self.notifier:
+                if not self.notifier.check_events():
+                    continue
+                self.notifier.read_events()
+                self.notifier.process_events()
+            else:
+                time.sleep(self.interval)
+            state = snapshot(self.folders)
+            changed = changes(self.state, state)
+            self.state = state
+            if changed:
+                return changed
@@ -0,0 +1,108 @@
+#
+# MGEN Site Genetator
+# Copyright Stanislav Yudin, 2010-2014
+#
+
+import os
+from xml.sax.saxutils import escape
+
+# Most urls in a site map file, larger site maps are split to shards
+sitemapUrls = 50000
+
+
+def xml_text(value):
+    '''Escaped unicode text of a value'''
+    if isinstance(value, str):
+        value = value.decode('utf-8', 'replace')
+    return escape(unicode(value))
+
+def shard_path(path, number):
+    '''Path of site map shard, i.e. sitemap-1.xml for sitemap.xml'''
+    root, ext = os.path.splitext(path)
+    return '%s-%d%s' % (root, number, ext)
+
+
+class FeedWriter(object):
+    '''RSS 2.0 feed written to a stream item by item'''
+
+    def __init__(self, stream, title, link, desc, lang):
+        self.stream = stream
+        self.stream.write('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            '   <channel>\n')
+        self.stream.write(u'      <title>%s</title>\n' % xml_text(title))
+        self.stream.write(u'      <link>%s</link>\n' % xml_text(link))
+        self.stream.write(u'      <description>%s</description>\n' % xml_text(desc))
+        self.stream.write(u'      <language>%s</language>\n' % xml_text(lang))
+
+    def item(self, title, pubDate, desc, link):
+        self.stream.write(u'        <item>\n'
+            u'            <title>%s</title>\n'
+            u'            <pubDate>%s</pubDate>\n'
+            u'            <description>%s</description>\n'
+            u'            <link>%s</link>\n'
+            u'        </item>\n' % (xml_text(title), xml_text(pubDate), xml_text(desc), xml_text(link)))
+
+    def close(self):
+        self.stream.write('   </channel>\n</rss>\n')
+        self.stream.close()
+
+
+class SitemapWriter(object):
+    '''Site map written url by url with a stream of writer. Once there are more than
+    limit urls, they go to sitemap-N.xml shards and path is a site map index of them.
+    rootUrl is the url shards are linked from'''
+
+    def __init__(self, writer, path, rootUrl, limit = sitemapUrls):
+        self.writer = writer
+        self.path = path
+        self.rootUrl = rootUrl
+        self.limit = limit
+        self.shards = []
+        self.stream = None
+        self.count = 0
+
+    def start(self, path):
+        self.stream = self.writer.open(path)
+        self.stream.write("<?xml version='1.0' encoding='UTF-8'?>\n"
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"\n'
+            '    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"\n'
+            '    xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9\n'
+            '                http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">\n')
+
+    def end(self):
+        self.stream.write('</urlset>\n')
+        self.stream.close()
+        self.stream = None
+
+    def url(self, loc):
+        if self.stream is None:
+            self.start(self.path)
+        elif self.count % self.limit == 0:
+            #full, first file becomes a shard too
+            if self.stream.path == self.path:
+                self.stream.path = shard_path(self.path, 1)
+            self.shards.append(self.stream.path)
+            self.end()
+            self.start(shard_path(self.path, len(self.shards) + 1))
+        self.stream.write(u'    <url>\n        <loc>%s</loc>\n    </url>\n' % xml_text(loc))
+        self.count += 1
+
+    def close(self):
+        '''Finish last site map file and write site map index if there are shards.
+        Returns paths of shards'''
+        if self.stream is None:
+            self.start(self.path)
+        if self.shards:
+            self.shards.append(self.stream.path)
+        self.end()
+        if self.shards:
+            index = self.writer.open(self.path)
+            index.write("<?xml version='1.0' encoding='UTF-8'?>\n"
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for shard in self.shards:
+                index.write(u'    <sitemap>\n        <loc>%s</loc>\n    </sitemap>\n' %
+                    xml_text(self.rootUrl + os.path.basename(shard)))
+            index.write('</sitemapindex>\n')
+            index.close()
+        return self.shards